@@ -0,0 +1,238 @@
+import math
+import weakref
+import numpy as np
+from fitness_cache import LRUCache
+import instrumentation
+from instance import csr_positions
+
+# Search nodes explored by the exact mode before it returns the best cover found so far
+NODE_LIMIT = 20_000
+
+_MISSING = object()
+_engines = weakref.WeakKeyDictionary()
+
+
+class CoverProblem:
+    """
+    Set-multicover of a demand vector by aisles, as sparse (item, aisle, stock) triples
+    over the demanded items only. Stock is capped at the item demand, which does not
+    change which aisle sets cover it. Columns are local aisle indexes into `aisles`.
+    """
+
+    def __init__(self, rows, aisles, stock, need):
+        self.need = need.astype(np.int64)
+        self.aisles, cols = np.unique(aisles, return_inverse=True)
+        self.n_cols = len(self.aisles)
+
+        # aisle-major copy of the triples, so the items of one aisle are a contiguous slice
+        order = np.argsort(cols, kind="stable")
+        self.rows = rows[order]
+        self.cols = cols[order]
+        self.stock = np.minimum(stock[order], self.need[self.rows]).astype(np.int64)
+        self.col_indptr = np.zeros(self.n_cols + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.cols, minlength=self.n_cols), out=self.col_indptr[1:])
+
+    def column(self, col):
+        start, end = self.col_indptr[col], self.col_indptr[col + 1]
+        return self.rows[start:end], self.stock[start:end]
+
+    def supply(self, cols_mask):
+        keep = cols_mask[self.cols]
+        return np.bincount(self.rows[keep], weights=self.stock[keep], minlength=len(self.need)).astype(np.int64)
+
+    def gains(self, residual, available):
+        gain = np.bincount(self.cols, weights=np.minimum(self.stock, residual[self.rows]), minlength=self.n_cols)
+        return np.where(available, gain, 0)
+
+
+def forced_columns(problem, available):
+    """
+    Reduction rule: an aisle is forced when the other available aisles cannot cover
+    one of its items. Applied until no new aisle is forced; returns the forced mask,
+    or None when some item cannot be covered at all.
+    """
+    forced = np.zeros(problem.n_cols, dtype=bool)
+    while True:
+        total = problem.supply(available | forced)
+        if np.any(total < problem.need):
+            return None
+        others = total[problem.rows] - problem.stock
+        new = (others < problem.need[problem.rows]) & ~forced[problem.cols] & available[problem.cols]
+        if not new.any():
+            return forced
+        forced[problem.cols[new]] = True
+        available = available & ~forced
+
+
+def greedy_cover(problem, chosen=None, available=None):
+    """
+    Greedy set-multicover: repeatedly adds the aisle covering the most residual demand,
+    then drops chosen aisles whose stock is not needed by the others. Returns the mask of
+    chosen columns, or None if the available aisles cannot cover the demand.
+    """
+    chosen = np.zeros(problem.n_cols, dtype=bool) if chosen is None else chosen.copy()
+    available = ~chosen if available is None else available & ~chosen
+    residual = np.maximum(problem.need - problem.supply(chosen), 0)
+    picked = []
+
+    while residual.any():
+        gain = problem.gains(residual, available)
+        col = int(np.argmax(gain))
+        if gain[col] <= 0:
+            return None
+        chosen[col] = True
+        available[col] = False
+        picked.append(col)
+        rows, stock = problem.column(col)
+        residual[rows] = np.maximum(residual[rows] - stock, 0)
+
+    # Redundancy elimination, latest (smallest gain) aisles first
+    supply = problem.supply(chosen)
+    for col in reversed(picked):
+        rows, stock = problem.column(col)
+        if np.all(supply[rows] - stock >= problem.need[rows]):
+            chosen[col] = False
+            supply[rows] -= stock
+    return chosen
+
+
+class BranchAndBound:
+    """
+    Exact minimum cover by depth-first branching on the uncovered item with the fewest
+    candidate aisles: the k-th branch takes its k-th best aisle and excludes the previous
+    ones. Nodes are pruned with the bound ceil(residual demand / best single aisle gain)
+    and the search stops after node_limit nodes, keeping the best cover found.
+    """
+
+    def __init__(self, problem, node_limit=NODE_LIMIT):
+        self.problem = problem
+        self.node_limit = node_limit
+        self.nodes = 0
+        self.best = None
+        self.optimal = True
+
+    def solve(self, chosen, available, incumbent):
+        self.best = incumbent
+        self._branch(chosen, available)
+        return self.best
+
+    def _branch(self, chosen, available):
+        problem = self.problem
+        self.nodes += 1
+        if self.nodes > self.node_limit:
+            self.optimal = False
+            return
+
+        residual = np.maximum(problem.need - problem.supply(chosen), 0)
+        num_chosen = int(chosen.sum())
+        if not residual.any():
+            if self.best is None or num_chosen < self.best.sum():
+                self.best = chosen.copy()
+            return
+
+        gain = problem.gains(residual, available)
+        if gain.max() <= 0:
+            return
+        if self.best is not None and num_chosen + math.ceil(residual.sum() / gain.max()) >= self.best.sum():
+            return
+        if np.any(problem.supply(available | chosen) < problem.need):
+            return
+
+        # Most constrained uncovered item and its candidate aisles by decreasing gain
+        open_entries = (residual[problem.rows] > 0) & available[problem.cols] & (problem.stock > 0)
+        candidates_per_item = np.bincount(problem.rows[open_entries], minlength=len(residual))
+        candidates_per_item[residual == 0] = np.iinfo(np.int64).max
+        item = int(np.argmin(candidates_per_item))
+        candidates = problem.cols[open_entries & (problem.rows == item)]
+        candidates = candidates[np.argsort(-gain[candidates], kind="stable")]
+
+        available = available.copy()
+        for col in candidates.tolist():
+            available[col] = False
+            chosen[col] = True
+            self._branch(chosen, available.copy())
+            chosen[col] = False
+            if self.nodes > self.node_limit:
+                return
+
+
+def solve_cover(problem, exact=False, node_limit=NODE_LIMIT):
+    """
+    Near-minimum (greedy) or, with exact=True, minimum (branch-and-bound, bounded by
+    node_limit) aisle cover of a CoverProblem. Returns the sorted aisle ids or None.
+    """
+    available = np.ones(problem.n_cols, dtype=bool)
+    forced = forced_columns(problem, available)
+    if forced is None:
+        return None
+
+    chosen = greedy_cover(problem, forced, available)
+    if chosen is None:
+        return None
+
+    if exact:
+        available = ~forced
+        chosen = BranchAndBound(problem, node_limit).solve(forced.copy(), available, chosen)
+
+    return problem.aisles[chosen].tolist()
+
+
+class AisleCover:
+    """
+    Aisle-cover engine of an instance: the smallest set of aisles (among the allowed ones)
+    whose stock covers a demand vector, the denominator of the wave objective.
+    Results are cached in an LRU keyed by the demand (and the allowed aisles).
+    """
+
+    def __init__(self, inst, cache_size=10_000):
+        self.inst = inst
+        self.indptr, self.item_aisles, self.item_aisle_qty = inst.item_aisles()
+        self.cache = LRUCache(cache_size)
+
+    def problem(self, demand, allowed_aisles=None):
+        items = np.nonzero(demand > 0)[0]
+        positions = csr_positions(self.indptr, items)
+        rows = np.repeat(np.arange(len(items)), self.indptr[items + 1] - self.indptr[items])
+        aisles, stock = self.item_aisles[positions], self.item_aisle_qty[positions]
+        if allowed_aisles is not None:
+            keep = allowed_aisles[aisles]
+            rows, aisles, stock = rows[keep], aisles[keep], stock[keep]
+        return CoverProblem(rows, aisles, stock, demand[items])
+
+    def cover(self, demand, allowed_aisles=None, exact=False, node_limit=NODE_LIMIT):
+        # Sorted aisle ids covering the demand, or None if the (allowed) aisles cannot cover it
+        items = np.nonzero(demand > 0)[0]
+        key = (items.tobytes(), demand[items].astype(np.int64).tobytes(), exact,
+               None if allowed_aisles is None else np.packbits(allowed_aisles).tobytes())
+        result = self.cache.get(key, _MISSING)
+        if result is _MISSING:
+            instrumentation.count("cover.cache_misses")
+            with instrumentation.timer("cover.solve"):
+                result = solve_cover(self.problem(demand, allowed_aisles), exact, node_limit)
+            self.cache.put(key, result)
+        else:
+            instrumentation.count("cover.cache_hits")
+        return None if result is None else list(result)
+
+
+def cover_engine(inst):
+    # AisleCover shared by every caller working on the same Instance
+    engine = _engines.get(inst)
+    if engine is None:
+        engine = _engines[inst] = AisleCover(inst)
+    return engine
+
+
+def cover_dicts(order, aisle_book, exact=False, node_limit=NODE_LIMIT):
+    # Same cover for a {item: qty} demand and an {item: {aisle: qty}} book; returns aisle ids or None
+    rows, aisles, stock, need = [], [], [], []
+    for row, (item, qty) in enumerate(order.items()):
+        need.append(qty)
+        for aisle, available in aisle_book.get(item, {}).items():
+            rows.append(row)
+            aisles.append(aisle)
+            stock.append(available)
+
+    problem = CoverProblem(np.array(rows, dtype=np.int64), np.array(aisles, dtype=np.int64),
+                           np.array(stock, dtype=np.int64), np.array(need, dtype=np.int64))
+    return solve_cover(problem, exact, node_limit)
@@ -0,0 +1,220 @@
+import contextlib
+import csv
+import glob
+import importlib
+import os
+import random
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from budget import Deadline
+from checker import WaveOrderPicking, instance_number
+from instance import load_instance
+
+# Peak memory comes from getrusage where it exists (not on Windows), else from psutil if installed
+try:
+    import resource
+except ImportError:
+    resource = None
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+DATASETS = "datasets/*/instance_*.txt"
+RESULT_FIELDS = ["solver", "instance", "rep", "seed", "objective", "feasible", "wall_time", "time_to_best",
+                 "iterations", "iterations_per_sec", "peak_rss_mb", "timed_out"]
+
+# Default iteration counts, fixed so that runs are comparable across commits
+ITERATIONS = {"graspV2": 20, "psoV3": 40, "pso": 200, "ip": 50}
+
+# Relative wall-time increase and absolute objective drop reported as regressions
+TIME_TOLERANCE = 0.25
+OBJECTIVE_TOLERANCE = 1e-6
+
+
+class TracingDeadline(Deadline):
+    # Deadline that records (elapsed, objective) of every incumbent reported by the solver
+    def __init__(self, seconds, objective):
+        super().__init__(seconds)
+        self.objective = objective
+        self.trace = []
+
+    def improved(self, incumbent):
+        super().improved(incumbent)
+        self.trace.append((self.elapsed(), self.objective(incumbent)))
+
+
+def wave_objective(inst, orders, aisles):
+    aisles = set(aisles)
+    if not aisles:
+        return 0.0
+    return float(inst.order_units[np.asarray(list(orders), dtype=np.int64)].sum()) / len(aisles)
+
+
+def peak_rss_mb():
+    # Peak resident set size of this process in MB, None when it cannot be measured
+    if resource is not None:
+        # ru_maxrss is in KB on Linux and in bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+    if psutil is not None:
+        memory = psutil.Process().memory_info()
+        return round(getattr(memory, "peak_wset", memory.rss) / (1024 * 1024), 1)
+    return None
+
+
+def run_graspV2(inst, seed, iterations, time_limit):
+    graspV2 = importlib.import_module("graspV2")
+    deadline = TracingDeadline(time_limit, lambda s: wave_objective(inst, s[0], s[3]))
+    solution = graspV2.grasp_aisle_based_batch(inst, iterations=iterations, rng=random.Random(seed), deadline=deadline)
+    return (None if solution is None else (solution[0], solution[3])), deadline, iterations
+
+
+def run_psoV3(inst, seed, iterations, time_limit):
+    psoV3 = importlib.import_module("psoV3")
+    deadline = TracingDeadline(time_limit, lambda p: wave_objective(inst, p[0], p[1].values()))
+    position, fitness = psoV3.pso(inst, deadline, seed=seed, iterations=iterations)
+    return (None if fitness <= 0 else (position[0], set(position[1].values()))), deadline, iterations
+
+
+def run_pso(inst, seed, iterations, time_limit):
+    pso = importlib.import_module("pso")
+    deadline = TracingDeadline(time_limit, lambda w: wave_objective(inst, w[0], w[1]))
+    selected_orders, visited_aisles, ratio = pso.binary_pso(inst, max_iterations=iterations, deadline=deadline, seed=seed)
+    return (None if ratio <= 0 else (selected_orders, visited_aisles)), deadline, iterations
+
+
+def run_ip(inst, seed, iterations, time_limit):
+    ip = importlib.import_module("integer-programaming")
+    deadline = TracingDeadline(time_limit, lambda b: b[2])
+    best = ip.dinkelbach(inst, max_iterations=iterations, deadline=deadline)
+    # Dinkelbach stops once the ratio converges, so max_iterations is not the count of solves
+    return (None if best is None else (best[0], best[1])), deadline, None
+
+
+SOLVERS = {"graspV2": run_graspV2, "psoV3": run_psoV3, "pso": run_pso, "ip": run_ip}
+SOLVER_MODULES = {"graspV2": "graspV2", "psoV3": "psoV3", "pso": "pso", "ip": "integer-programaming"}
+
+
+def _benchmark_run(solver, input_file, rep, seed, iterations, time_limit):
+    # Runs in a fresh process so that peak RSS belongs to this run only
+    inst = load_instance(input_file)
+    importlib.import_module(SOLVER_MODULES[solver])  # keeps import time out of the wall time
+    start = time.monotonic()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        wave, deadline, iterations = SOLVERS[solver](inst, seed, iterations, time_limit)
+    wall_time = time.monotonic() - start
+
+    objective, feasible = 0.0, False
+    if wave is not None:
+        orders, aisles = list(wave[0]), list(set(wave[1]))
+        checker = WaveOrderPicking(inst)
+        feasible = bool(checker.is_solution_feasible(orders, aisles))
+        objective = wave_objective(inst, orders, aisles)
+
+    time_to_best = next((t for t, value in deadline.trace if value >= objective - OBJECTIVE_TOLERANCE), None)
+    timed_out = deadline.expired()
+    return {
+        "solver": solver,
+        "instance": os.path.basename(input_file),
+        "rep": rep,
+        "seed": seed,
+        "objective": round(objective, 6),
+        "feasible": feasible,
+        "wall_time": round(wall_time, 3),
+        "time_to_best": None if time_to_best is None else round(time_to_best, 3),
+        # a run stopped by the time limit did not complete its iterations
+        "iterations": None if timed_out or iterations is None else iterations,
+        "iterations_per_sec": None if timed_out or iterations is None else round(iterations / wall_time, 3),
+        "peak_rss_mb": peak_rss_mb(),
+        "timed_out": timed_out,
+    }
+
+
+def run_benchmark(solver, input_files, reps=1, seed=0, iterations=None, time_limit=None):
+    """
+    Runs `solver` reps times on every input file, seeds seed, seed + 1, ..., each run in
+    its own process. Runs are sequential so that timings do not compete for cores.
+    """
+    iterations = ITERATIONS[solver] if iterations is None else iterations
+    results = []
+    for input_file in input_files:
+        for rep in range(reps):
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                result = executor.submit(_benchmark_run, solver, input_file, rep, seed + rep, iterations, time_limit).result()
+            print(f"{result['instance']} rep {rep}: objective {result['objective']} in {result['wall_time']}s", file=sys.stderr)
+            results.append(result)
+    return results
+
+
+def write_results(results, results_file):
+    with open(results_file, "w", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=RESULT_FIELDS)
+        writer.writeheader()
+        writer.writerows(results)
+
+
+def read_results(results_file):
+    with open(results_file, newline="") as file:
+        return list(csv.DictReader(file))
+
+
+def summarize(results):
+    # (solver, instance) -> median wall time and best objective over the repetitions
+    groups = {}
+    for row in results:
+        groups.setdefault((row["solver"], row["instance"]), []).append(row)
+    return {key: {"wall_time": statistics.median(float(r["wall_time"]) for r in rows),
+                  "objective": max(float(r["objective"]) for r in rows)}
+            for key, rows in groups.items()}
+
+
+def compare(results, baseline, time_tolerance=TIME_TOLERANCE, objective_tolerance=OBJECTIVE_TOLERANCE):
+    """
+    Diffs results against baseline rows (both as produced by run_benchmark/read_results)
+    and returns one line per (solver, instance) whose median wall time grew by more than
+    time_tolerance or whose best objective dropped by more than objective_tolerance.
+    """
+    current, previous = summarize(results), summarize(baseline)
+    regressions = []
+    for key in sorted(current.keys() & previous.keys()):
+        now, before = current[key], previous[key]
+        if now["wall_time"] > before["wall_time"] * (1 + time_tolerance):
+            regressions.append(f"{key[0]} {key[1]}: wall time {before['wall_time']:.3f}s -> {now['wall_time']:.3f}s")
+        if now["objective"] < before["objective"] - objective_tolerance:
+            regressions.append(f"{key[0]} {key[1]}: objective {before['objective']:.4f} -> {now['objective']:.4f}")
+    return regressions
+
+
+if __name__ == "__main__":
+    # python benchmark.py <solver> [--instances 1,3,5] [--reps N] [--seed S] [--iterations N]
+    #                     [--time-limit T] [--output results.csv] [--baseline baseline.csv]
+    if len(sys.argv) < 2 or sys.argv[1] not in SOLVERS:
+        print(f"Usage: python benchmark.py <{'|'.join(SOLVERS)}> [--option value ...]")
+        sys.exit(1)
+
+    solver = sys.argv[1]
+    options = dict(zip(sys.argv[2::2], sys.argv[3::2]))
+
+    input_files = sorted(glob.glob(DATASETS))
+    if "--instances" in options:
+        wanted = {int(n) for n in options["--instances"].split(",")}
+        input_files = [f for f in input_files if instance_number(os.path.basename(f)) in wanted]
+
+    time_limit = float(options["--time-limit"]) if "--time-limit" in options else None
+    iterations = int(options["--iterations"]) if "--iterations" in options else None
+    results = run_benchmark(solver, input_files, reps=int(options.get("--reps", 1)), seed=int(options.get("--seed", 0)),
+                            iterations=iterations, time_limit=time_limit)
+
+    output = options.get("--output", f"benchmark_{solver}.csv")
+    write_results(results, output)
+    print(f"Results written to {output}")
+
+    if "--baseline" in options:
+        regressions = compare(results, read_results(options["--baseline"]))
+        for line in regressions:
+            print("REGRESSION", line)
+        sys.exit(1 if regressions else 0)
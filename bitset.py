@@ -0,0 +1,61 @@
+import weakref
+import numpy as np
+
+_bitsets = weakref.WeakKeyDictionary()
+
+
+def from_ids(ids):
+    # Bitset (Python int, bit a set for aisle a) of an iterable of ids
+    mask = 0
+    for a in ids:
+        mask |= 1 << int(a)
+    return mask
+
+
+def from_bool(flags):
+    # Bitset of a boolean mask, packed eight flags per byte instead of one shift per id
+    return int.from_bytes(np.packbits(np.asarray(flags, dtype=bool), bitorder="little").tobytes(), "little")
+
+
+def to_ids(mask):
+    # Sorted ids of the set bits, one lowest-bit extraction per member
+    ids = []
+    while mask:
+        low = mask & -mask
+        ids.append(low.bit_length() - 1)
+        mask ^= low
+    return ids
+
+
+class AisleBitsets:
+    """
+    Aisle membership of every item as bitsets over the aisles of an instance:
+    item_masks[i] is a Python int with the bits of the aisles stocking item i.
+    Aisle sets are Python ints, so union, intersection and size are |, & and bit_count().
+    """
+
+    def __init__(self, inst):
+        self.n_aisles = inst.n_aisles
+        indptr, aisles, _ = inst.item_aisles()
+
+        rows = np.repeat(np.arange(inst.n_items), np.diff(indptr))
+        flags = np.zeros((inst.n_items, inst.n_aisles), dtype=bool)
+        flags[rows, aisles] = True
+        packed = np.packbits(flags, axis=1, bitorder="little")
+        self.item_masks = [int.from_bytes(row.tobytes(), "little") for row in packed]
+        self.stocked = from_bool(np.diff(inst.aisle_indptr) > 0)
+
+    def aisles_with(self, items):
+        # Aisles stocking at least one of the items
+        mask = 0
+        for i in np.asarray(items).tolist():
+            mask |= self.item_masks[i]
+        return mask
+
+
+def aisle_bitsets(inst):
+    # AisleBitsets shared by every caller working on the same Instance
+    bitsets = _bitsets.get(inst)
+    if bitsets is None:
+        bitsets = _bitsets[inst] = AisleBitsets(inst)
+    return bitsets
@@ -0,0 +1,114 @@
+import sys
+import numpy as np
+import explorer
+
+# Relative tolerance under which an incumbent counts as meeting the bound
+GAP_TOLERANCE = 1e-9
+
+
+def useful_stock(inst, multiplicity=None):
+    # Stock of every aisle capped, item by item, at the total demand of all orders;
+    # merged orders (reduction.Reduction) count once per copy in `multiplicity`
+    qty = inst.order_qty if multiplicity is None else inst.order_qty * multiplicity[inst.order_rows]
+    total_demand = np.bincount(inst.order_items, weights=qty, minlength=inst.n_items)
+    rows = np.repeat(np.arange(inst.n_aisles), np.diff(inst.aisle_indptr))
+    capped = np.minimum(inst.aisle_qty, total_demand[inst.aisle_items])
+    return np.bincount(rows, weights=capped, minlength=inst.n_aisles)
+
+
+def capacity_bound(inst, multiplicity=None):
+    """
+    Bound from aisle capacities: a wave visiting k aisles picks at most the useful stock
+    of the k best aisles, at most wave_size_ub and at most every order's units, and k
+    must be large enough for those aisles to hold wave_size_lb units. Returns
+    (bound, k) with the k attaining max_k min(ub, U_k, total) / k, or (0.0, None) if
+    no aisle count can reach the lower bound. With merged orders, `multiplicity` weights
+    their demand and units by the number of copies that may be picked.
+    """
+    stock = np.cumsum(np.sort(useful_stock(inst, multiplicity))[::-1])
+    k = np.arange(1, len(stock) + 1)
+    units = inst.order_units if multiplicity is None else inst.order_units * multiplicity
+    picked = np.minimum(np.minimum(stock, inst.wave_size_ub), float(units.sum()))
+    ratios = np.where(stock >= inst.wave_size_lb, picked / k, 0.0)
+    if len(ratios) == 0 or ratios.max() <= 0:
+        return 0.0, None
+    best = int(np.argmax(ratios))
+    return float(ratios[best]), best + 1
+
+
+def lp_bound(inst, time_limit=None):
+    """
+    LP relaxation of the ratio model after the Charnes-Cooper transform (X = t x,
+    Y = t y, sum Y = 1), over the compact item-supply rows. Returns the LP optimum,
+    an upper bound on units / aisles, or None if the LP was not solved.
+    """
+    # Imported here: the heuristics use the other bounds and do not need pulp installed
+    import pulp
+
+    model = pulp.LpProblem("Ratio_Relaxation", pulp.LpMaximize)
+    stocked_aisles = np.nonzero(np.diff(inst.aisle_indptr))[0].tolist()
+    X = pulp.LpVariable.dicts("X", range(inst.n_orders), lowBound=0)
+    Y = pulp.LpVariable.dicts("Y", stocked_aisles, lowBound=0)
+    t = pulp.LpVariable("t", lowBound=0)
+
+    order_units = inst.order_units.tolist()
+    units = pulp.LpAffineExpression([(X[o], order_units[o]) for o in X])
+    model += units
+    model += pulp.LpAffineExpression([(Y[a], 1) for a in Y]) == 1
+    model += units >= inst.wave_size_lb * t
+    model += units <= inst.wave_size_ub * t
+    for o in X:
+        model += X[o] <= t
+    for a in Y:
+        model += Y[a] <= t
+
+    order_indptr, item_orders, order_qty = (a.tolist() for a in inst.item_orders())
+    aisle_indptr, item_aisles, aisle_qty = (a.tolist() for a in inst.item_aisles())
+    for i in range(inst.n_items):
+        if order_indptr[i] == order_indptr[i + 1]:
+            continue
+        terms = [(X[o], q) for o, q in zip(item_orders[order_indptr[i]:order_indptr[i + 1]], order_qty[order_indptr[i]:order_indptr[i + 1]])]
+        terms += [(Y[a], -u) for a, u in zip(item_aisles[aisle_indptr[i]:aisle_indptr[i + 1]], aisle_qty[aisle_indptr[i]:aisle_indptr[i + 1]])]
+        model += pulp.LpConstraint(pulp.LpAffineExpression(terms), pulp.LpConstraintLE, f"Supply_{i}", 0)
+
+    model.solve(pulp.PULP_CBC_CMD(msg=False, timeLimit=time_limit))
+    if pulp.LpStatus[model.status] != "Optimal":
+        return None
+    return pulp.value(model.objective)
+
+
+def upper_bound(inst, lp=False, time_limit=None):
+    # Tightest of the available bounds; the LP relaxation is opt-in since it needs a solver run
+    bound, _ = capacity_bound(inst)
+    if lp:
+        relaxed = lp_bound(inst, time_limit)
+        if relaxed is not None:
+            bound = min(bound, relaxed)
+    return bound
+
+
+def gap(incumbent, bound):
+    # Relative optimality gap of an incumbent ratio against an upper bound
+    if bound is None or bound <= 0:
+        return None
+    return max(0.0, (bound - incumbent) / bound)
+
+
+def reached(incumbent, bound):
+    return bound is not None and incumbent >= bound * (1 - GAP_TOLERANCE)
+
+
+def format_gap(incumbent, bound):
+    value = gap(incumbent, bound)
+    return "gap unknown" if value is None else f"upper bound {bound:.4f}, gap {100 * value:.2f}%"
+
+
+if __name__ == "__main__":
+    # python bounds.py [input_file] [--lp]
+    args = [a for a in sys.argv[1:] if a != "--lp"]
+    inst = explorer.load(args[0] if args else None)
+
+    bound, k = capacity_bound(inst)
+    print(f"Capacity bound: {bound:.4f} (at {k} aisles)")
+    if "--lp" in sys.argv:
+        print(f"LP relaxation bound: {lp_bound(inst)}")
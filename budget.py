@@ -0,0 +1,50 @@
+import time
+
+# Wall-clock limit of a challenge run (run_challenge.py kills the solver at 605s)
+CHALLENGE_TIME_LIMIT = 600
+
+
+class Deadline:
+    """
+    Wall-clock budget shared by the solvers. Solvers poll expired() in their main
+    loops and report every new incumbent through improved(); the incumbent is passed
+    to the checkpoint callback at most once every checkpoint_interval seconds, and
+    flush() writes the last one still pending.
+    A Deadline built with seconds=None never expires; `stop`, an Event shared with
+    other processes, ends it early once set.
+    """
+
+    def __init__(self, seconds=None, checkpoint=None, checkpoint_interval=1.0, stop=None):
+        self.start = time.monotonic()
+        self.end = None if seconds is None else self.start + seconds
+        self.stop = stop
+        self.checkpoint = checkpoint
+        self.checkpoint_interval = checkpoint_interval
+        self.incumbent = None
+        self._pending = False
+        self._last_checkpoint = self.start
+
+    def elapsed(self):
+        return time.monotonic() - self.start
+
+    def remaining(self):
+        if self.end is None:
+            return None
+        return max(0.0, self.end - time.monotonic())
+
+    def expired(self):
+        if self.stop is not None and self.stop.is_set():
+            return True
+        return self.end is not None and time.monotonic() >= self.end
+
+    def improved(self, incumbent):
+        self.incumbent = incumbent
+        self._pending = True
+        if self.checkpoint is not None and time.monotonic() - self._last_checkpoint >= self.checkpoint_interval:
+            self.flush()
+
+    def flush(self):
+        if self.checkpoint is not None and self._pending:
+            self.checkpoint(self.incumbent)
+            self._last_checkpoint = time.monotonic()
+        self._pending = False
@@ -1,91 +1,172 @@
+import csv
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
+from instance import load_instance
+from solution_io import read_solution
 
 class WaveOrderPicking:
-    def __init__(self):
-        self.orders = None
-        self.aisles = None
+    def __init__(self, instance=None):
+        self.instance = None
         self.wave_size_lb = None
         self.wave_size_ub = None
+        self._orders = None
+        self._aisles = None
+        if instance is not None:
+            self.set_instance(instance)
+
+    def set_instance(self, instance):
+        self.instance = instance
+        self.wave_size_lb = instance.wave_size_lb
+        self.wave_size_ub = instance.wave_size_ub
+        self._orders = None
+        self._aisles = None
+
+    @property
+    def orders(self):
+        # [{item: qty}] per order, built from the CSR instance on first use
+        if self._orders is None and self.instance is not None:
+            self._orders = self.instance.order_dicts()
+        return self._orders
+
+    @property
+    def aisles(self):
+        # [{item: qty}] per aisle, built from the CSR instance on first use
+        if self._aisles is None and self.instance is not None:
+            self._aisles = self.instance.aisle_dicts()
+        return self._aisles
 
     def read_input(self, input_file_path):
-        with open(input_file_path, 'r') as file:
-            lines = file.readlines()
-            first_line = lines[0].strip().split()
-            o, i, a = int(first_line[0]), int(first_line[1]), int(first_line[2])
-
-            # Read orders
-            self.orders = []
-            for j in range(o):
-                order_line = lines[j + 1].strip().split()
-                d = int(order_line[0])
-                order_map = {int(order_line[2 * k + 1]): int(order_line[2 * k + 2]) for k in range(d)}
-                self.orders.append(order_map)
-
-            # Read aisles
-            self.aisles = []
-            for j in range(a):
-                aisle_line = lines[j + o + 1].strip().split()
-                d = int(aisle_line[0])
-                aisle_map = {int(aisle_line[2 * k + 1]): int(aisle_line[2 * k + 2]) for k in range(d)}
-                self.aisles.append(aisle_map)
-
-            # Read wave size bounds
-            bounds = lines[o + a + 1].strip().split()
-            self.wave_size_lb = int(bounds[0])
-            self.wave_size_ub = int(bounds[1])
+        self.set_instance(load_instance(input_file_path))
 
     def read_output(self, output_file_path):
-        with open(output_file_path, 'r') as file:
-            lines = file.readlines()
-            num_orders = int(lines[0].strip())
-            selected_orders = [int(lines[i + 1].strip()) for i in range(num_orders)]
-            num_aisles = int(lines[num_orders + 1].strip())
-            visited_aisles = [int(lines[num_orders + 2 + i].strip()) for i in range(num_aisles)]
+        selected_orders, visited_aisles = read_solution(output_file_path)
 
         selected_orders = list(set(selected_orders))
         visited_aisles = list(set(visited_aisles))
         return selected_orders, visited_aisles
 
+    def order_mask(self, selected_orders):
+        mask = np.zeros(self.instance.n_orders, dtype=bool)
+        mask[np.asarray(selected_orders, dtype=np.int64)] = True
+        return mask
+
     def is_solution_feasible(self, selected_orders, visited_aisles):
-        total_units_picked = 0
-        for order in selected_orders:
-            total_units_picked += np.sum(list(self.orders[order].values()))
+        order_mask = self.order_mask(selected_orders)
+        total_units_picked = self.instance.order_units[order_mask].sum()
 
         # Check if total units picked are within bounds
         if not (self.wave_size_lb <= total_units_picked <= self.wave_size_ub):
             return False
 
-        # Compute all items that are required by the selected orders
-        required_items = set()
-        for order in selected_orders:
-            required_items.update(self.orders[order].keys())
-
-        # Check if all required items are available in the visited aisles
-        for item in required_items:
-            total_required = sum(self.orders[order].get(item, 0) for order in selected_orders)
-            total_available = sum(self.aisles[aisle].get(item, 0) for aisle in visited_aisles)
-            if total_required > total_available:
-                return False
-
-        return True
+        # Check if the demand of every item is covered by the stock of the visited aisles
+        demand = self.instance.demand(order_mask)
+        supply = self.instance.supply(set(visited_aisles))
+        return bool(np.all(demand <= supply))
 
     def compute_objective_function(self, selected_orders, visited_aisles):
-        total_units_picked = 0
-
         # Calculate total units picked
-        for order in selected_orders:
-            total_units_picked += np.sum(list(self.orders[order].values()))
+        total_units_picked = self.instance.order_units[self.order_mask(selected_orders)].sum()
 
         # Calculate the number of visited aisles
         num_visited_aisles = len(visited_aisles)
 
+        # A wave visiting no aisle picks nothing, it scores 0 rather than dividing by zero
+        if num_visited_aisles == 0:
+            return 0.0
+
         # Objective function: total units picked / number of visited aisles
         return total_units_picked / num_visited_aisles
 
+def instance_number(file_name):
+    # Instances and solutions are paired by the last number in their file names
+    numbers = re.findall(r"\d+", os.path.splitext(os.path.basename(file_name))[0])
+    return int(numbers[-1]) if numbers else None
+
+
+def check_solution(input_file, output_file):
+    result = {
+        "instance": os.path.basename(input_file),
+        "input_file": input_file,
+        "output_file": output_file,
+        "status": "ok",
+        "feasible": False,
+        "objective": None,
+        "units": None,
+        "orders": None,
+        "aisles": None,
+        "check_time": None,
+    }
+    start = time.perf_counter()
+
+    if output_file is None or not os.path.exists(output_file):
+        result["status"] = "missing"
+        return result
+
+    try:
+        wave_order_picking = WaveOrderPicking()
+        wave_order_picking.read_input(input_file)
+        selected_orders, visited_aisles = wave_order_picking.read_output(output_file)
+
+        result["feasible"] = wave_order_picking.is_solution_feasible(selected_orders, visited_aisles)
+        result["units"] = int(wave_order_picking.instance.order_units[wave_order_picking.order_mask(selected_orders)].sum())
+        result["orders"] = len(selected_orders)
+        result["aisles"] = len(visited_aisles)
+        if visited_aisles:
+            result["objective"] = float(wave_order_picking.compute_objective_function(selected_orders, visited_aisles))
+    except (OSError, ValueError, IndexError) as e:
+        result["status"] = f"error: {e}"
+
+    result["check_time"] = time.perf_counter() - start
+    return result
+
+
+def check_directory(input_folder, output_folder, workers=None):
+    outputs = {}
+    for filename in os.listdir(output_folder):
+        if filename.endswith(".txt") and instance_number(filename) is not None:
+            outputs[instance_number(filename)] = os.path.join(output_folder, filename)
+
+    inputs = sorted(
+        (instance_number(filename), os.path.join(input_folder, filename))
+        for filename in os.listdir(input_folder)
+        if filename.endswith(".txt") and instance_number(filename) is not None
+    )
+    input_files = [input_file for _, input_file in inputs]
+    output_files = [outputs.get(number) for number, _ in inputs]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(check_solution, input_files, output_files))
+
+
+def write_summary(results, summary_file=None):
+    if summary_file is not None and summary_file.endswith(".csv"):
+        with open(summary_file, "w", newline="") as file:
+            writer = csv.DictWriter(file, fieldnames=list(results[0].keys()) if results else [])
+            writer.writeheader()
+            writer.writerows(results)
+    elif summary_file is not None:
+        with open(summary_file, "w") as file:
+            json.dump(results, file, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+
 if __name__ == "__main__":
     import sys
+    if len(sys.argv) >= 4 and sys.argv[1] == "--batch":
+        summary = sys.argv[4] if len(sys.argv) > 4 else None
+        results = check_directory(sys.argv[2], sys.argv[3])
+        write_summary(results, summary)
+        # Missing, unreadable or infeasible solutions all fail the batch
+        sys.exit(0 if all(r["status"] == "ok" and r["feasible"] for r in results) else 2)
+
     if len(sys.argv) != 3:
         print("Usage: python checker.py <input_file> <output_file>")
+        print("       python checker.py --batch <input_folder> <output_folder> [<summary.json|summary.csv>]")
         sys.exit(1)
 
     wave_order_picking = WaveOrderPicking()
@@ -0,0 +1,128 @@
+import numpy as np
+
+ADD_ORDER = "add_order"
+DROP_ORDER = "drop_order"
+ADD_AISLE = "add_aisle"
+DROP_AISLE = "drop_aisle"
+
+INVERSE_MOVE = {
+    ADD_ORDER: DROP_ORDER,
+    DROP_ORDER: ADD_ORDER,
+    ADD_AISLE: DROP_AISLE,
+    DROP_AISLE: ADD_AISLE,
+}
+
+
+class IncrementalEvaluator:
+    """
+    Incremental state of a wave: the stock of the visited aisles, the aggregated demand
+    of the selected orders, the unit total and the number of items whose demand exceeds
+    the stock. Every move only touches the items of the order or aisle it changes.
+    """
+
+    def __init__(self, inst, orders=(), aisles=()):
+        self.inst = inst
+        self.order_selected = np.zeros(inst.n_orders, dtype=bool)
+        self.aisle_selected = np.zeros(inst.n_aisles, dtype=bool)
+        self.stock = np.zeros(inst.n_items, dtype=np.int64)
+        self.demand = np.zeros(inst.n_items, dtype=np.int64)
+        self.units = 0
+        self.num_aisles = 0
+        self.num_short = 0
+        self.history = []
+
+        for o in orders:
+            self.apply(ADD_ORDER, o)
+        for a in aisles:
+            self.apply(ADD_AISLE, a)
+        self.history.clear()
+
+    def _row(self, move, idx):
+        if move in (ADD_ORDER, DROP_ORDER):
+            return self.inst.order(idx)
+        return self.inst.aisle(idx)
+
+    def _delta(self, move, idx):
+        # Change of (units, aisles, short items) caused by a move, without applying it
+        items, qty = self._row(move, idx)
+        stock = self.stock[items]
+        demand = self.demand[items]
+        short_before = np.count_nonzero(demand > stock)
+
+        if move == ADD_ORDER:
+            return int(self.inst.order_units[idx]), 0, np.count_nonzero(demand + qty > stock) - short_before
+        if move == DROP_ORDER:
+            return -int(self.inst.order_units[idx]), 0, np.count_nonzero(demand - qty > stock) - short_before
+        if move == ADD_AISLE:
+            return 0, 1, np.count_nonzero(demand > stock + qty) - short_before
+        return 0, -1, np.count_nonzero(demand > stock - qty) - short_before
+
+    def _check(self, move, idx):
+        if move == ADD_ORDER and self.order_selected[idx]:
+            raise ValueError(f"order {idx} is already selected")
+        if move == DROP_ORDER and not self.order_selected[idx]:
+            raise ValueError(f"order {idx} is not selected")
+        if move == ADD_AISLE and self.aisle_selected[idx]:
+            raise ValueError(f"aisle {idx} is already visited")
+        if move == DROP_AISLE and not self.aisle_selected[idx]:
+            raise ValueError(f"aisle {idx} is not visited")
+
+    def peek(self, move, idx):
+        # (units, aisles, feasible) of the neighbor reached by a move
+        self._check(move, idx)
+        d_units, d_aisles, d_short = self._delta(move, idx)
+        units = self.units + d_units
+        feasible = self.num_short + d_short == 0 and self.inst.wave_size_lb <= units <= self.inst.wave_size_ub
+        return units, self.num_aisles + d_aisles, feasible
+
+    def apply(self, move, idx):
+        self._check(move, idx)
+        d_units, d_aisles, d_short = self._delta(move, idx)
+        items, qty = self._row(move, idx)
+
+        if move == ADD_ORDER:
+            self.demand[items] += qty
+            self.order_selected[idx] = True
+        elif move == DROP_ORDER:
+            self.demand[items] -= qty
+            self.order_selected[idx] = False
+        elif move == ADD_AISLE:
+            self.stock[items] += qty
+            self.aisle_selected[idx] = True
+        else:
+            self.stock[items] -= qty
+            self.aisle_selected[idx] = False
+
+        self.units += d_units
+        self.num_aisles += d_aisles
+        self.num_short += d_short
+        self.history.append((move, idx))
+
+    def mark(self):
+        return len(self.history)
+
+    def undo(self):
+        move, idx = self.history.pop()
+        self.apply(INVERSE_MOVE[move], idx)
+        self.history.pop()
+
+    def undo_to(self, mark):
+        while len(self.history) > mark:
+            self.undo()
+
+    def fits(self, o):
+        # True if the order can be added without exceeding the stock of the visited aisles
+        items, qty = self.inst.order(o)
+        return bool(np.all(self.stock[items] - self.demand[items] >= qty))
+
+    def is_feasible(self):
+        return self.num_short == 0 and self.inst.wave_size_lb <= self.units <= self.inst.wave_size_ub
+
+    def objective(self):
+        return self.units / self.num_aisles if self.num_aisles else 0
+
+    def selected_orders(self):
+        return set(np.nonzero(self.order_selected)[0].tolist())
+
+    def visited_aisles(self):
+        return set(np.nonzero(self.aisle_selected)[0].tolist())
@@ -8,57 +8,22 @@ import random
 import matplotlib.pyplot as plt
 from collections import defaultdict
 from itertools import combinations
+import instance
+import aisle_cover
+import bitset
 
 path = "/home/joaovolp/challenge-sbpo-2025/datasets/a"
 
 
-def parse():
-    with open(f"{path}/instance_0005.txt","r") as file:
-        lines = file.readlines()
-        lines = [line.strip() for line in lines if line.strip()]
-        first_line = lines[0].split()
-        orders = int(first_line[0])
-        items = int(first_line[1])
-        aisle = int(first_line[2])
-
-        orders_list = []
-        #aisle_list = []
-
-        for line in lines[1:orders+1]:
-            line = line.split()
-            size = int(line[0])
-            i = 1
-            orders_book = {}
-            while i <= size * 2:
-                item = int(line[i])
-                quantity = int(line[i+1])
-                orders_book[item] = quantity
-                i += 2
-            orders_list.append(copy.deepcopy(orders_book))
-
-        aisle_book = {}
-        aisle_num = 0
-        for line in lines[1 + orders: - 1]:            
-            line = line.split()
-            size = int(line[0])
-            i = 1
-            while i <= size * 2:
-                item_num = int(line[i])
-                quantity = int(line[i+1])
-                if item_num not in aisle_book.keys():
-                    aisle_book[item_num] = {aisle_num : quantity}
-                else:
-                    aisle_book[item_num].update({aisle_num : quantity})
-                i += 2
-            aisle_num += 1
-
-        list = lines[-1].split()
-        lower_b = list[0]
-        upper_b = list[1]
-
-        #print(orders_list)
-
-        return orders_list, aisle_book, int(lower_b), int(upper_b)
+def load(file_path=None):
+    if file_path is None:
+        file_path = f"{path}/instance_0005.txt"
+    return instance.load_instance(file_path)
+
+
+def parse(file_path=None):
+    inst = load(file_path)
+    return inst.order_dicts(), inst.aisle_book(), inst.wave_size_lb, inst.wave_size_ub
 
 
 def find_cost_for_wave(wave, orders_list, aisle_book):
@@ -105,59 +70,27 @@ def validate_wave(wave,orders_list, lower_b, upper_b):
         return False, _
     
 def is_valid_combination(selected_corridors, order, warehouse):
-    items_picked = defaultdict(int)
-    for corridor in selected_corridors:
-        for item in warehouse:
-            if corridor in warehouse[item]:
-                items_picked[item] += warehouse[item][corridor]
-    
-    return all(items_picked[item] >= order[item] for item in order)
+    # Only the items of the order are visited; corridor membership is a bit test on the selection
+    selected = bitset.from_ids(selected_corridors)
+    for item, qty in order.items():
+        picked = sum(stock for corridor, stock in warehouse.get(item, {}).items() if selected >> corridor & 1)
+        if picked < qty:
+            return False
+    return True
 
 def find_aisles_and_items(order,aisle_book):
-    corridors_visited = set()
-    items_to_pick = order.copy()
-    retrieval_plan = defaultdict(int)
-
-    corridor_scores = defaultdict(int)
-    for item, corridors in aisle_book.items():
-        if item in items_to_pick:
-            for corridor, available in corridors.items():
-                corridor_scores[corridor] += min(items_to_pick[item], available)
-
-    sorted_corridors = sorted(corridor_scores.items(), key=lambda x: x[1], reverse=True)
-
-    for corridor, _ in sorted_corridors:
-        for item in aisle_book:
-            if item in items_to_pick and items_to_pick[item] > 0 and corridor in aisle_book[item]:
-                take = min(items_to_pick[item], aisle_book[item][corridor])
-                retrieval_plan[(item, corridor)] += take
-                corridors_visited.add(corridor)
-                items_to_pick[item] -= take
-
-    if any(amount > 0 for amount in items_to_pick.values()):
+    # Greedy set-multicover with reduction rules (aisle_cover), 1000 if the warehouse cannot supply the order
+    corridors = aisle_cover.cover_dicts(order, aisle_book)
+    if corridors is None:
         return 1000
 
-    return len(corridors_visited)
+    return len(corridors)
 
 def find_aisles_and_items_exaustive(order, aisle_book):
-    all_corridors = set()
-    for corridors in aisle_book.values():
-        all_corridors.update(corridors.keys())
-    
-    # Try from the smallest number of corridors upwards
-    for r in range(1, len(all_corridors) + 1):
-        for selected_corridors in combinations(all_corridors, r):
-            if is_valid_combination(selected_corridors, order, aisle_book):
-                retrieval_plan = defaultdict(int)
-                remaining_order = order.copy()
-                for corridor in selected_corridors:
-                    for item in aisle_book:
-                        if item in remaining_order and remaining_order[item] > 0 and corridor in aisle_book[item]:
-                            take = min(remaining_order[item], aisle_book[item][corridor])
-                            retrieval_plan[(item, corridor)] += take
-                            remaining_order[item] -= take
-                
-                return len(selected_corridors)
+    # Minimum number of corridors through the bounded branch-and-bound of aisle_cover
+    corridors = aisle_cover.cover_dicts(order, aisle_book, exact=True)
+    if corridors is not None:
+        return len(corridors)
 
 def aisles_for_order_cost(item : int, qnty : int, aisle_book : dict):
     visited_aisle = []
@@ -0,0 +1,98 @@
+from collections import OrderedDict
+import numpy as np
+
+_MIX_1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX_2 = np.uint64(0x94D049BB133111EB)
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+
+
+def splitmix64(values):
+    # splitmix64 finalizer over a uint64 array (wrapping arithmetic)
+    z = values.astype(np.uint64, copy=True)
+    z ^= z >> np.uint64(30)
+    z *= _MIX_1
+    z ^= z >> np.uint64(27)
+    z *= _MIX_2
+    z ^= z >> np.uint64(31)
+    return z
+
+
+class ZobristHasher:
+    """
+    64-bit Zobrist hashing of (order selection, per-item aisle choice) states: the hash
+    is the XOR of a random key per selected order and a key per (item, choice) pair, so
+    it can be updated in O(changed bits) when orders flip or item choices change.
+    """
+
+    def __init__(self, n_orders, n_items, seed=None):
+        rng = np.random.default_rng(seed)
+        self.order_keys = rng.integers(0, 2**64 - 1, size=n_orders, dtype=np.uint64, endpoint=True)
+        self.item_keys = rng.integers(0, 2**64 - 1, size=n_items, dtype=np.uint64, endpoint=True)
+
+    def choice_keys(self, items, choices):
+        return splitmix64(self.item_keys[items] + np.asarray(choices, dtype=np.uint64) * _GOLDEN)
+
+    def hash_orders(self, orders):
+        # Hashes of the order selections alone, rows of a (states x orders) matrix
+        return np.bitwise_xor.reduce(np.where(orders, self.order_keys, np.uint64(0)), axis=1)
+
+    def hash_choices(self, choice):
+        # Hashes of the aisle choices alone, rows of a (states x items) matrix
+        items = np.arange(choice.shape[1])
+        return np.bitwise_xor.reduce(self.choice_keys(items[None, :], choice), axis=1)
+
+    def hash_states(self, orders, choice):
+        # Full hashes of a (states x orders) selection and (states x items) choice matrix
+        return self.hash_orders(orders) ^ self.hash_choices(choice)
+
+    def flip_orders(self, hashes, rows, orders):
+        # Updates hashes in place for the (row, order) bits that flipped
+        np.bitwise_xor.at(hashes, rows, self.order_keys[orders])
+
+    def change_choices(self, hashes, rows, items, old_choices, new_choices):
+        # Updates hashes in place for the (row, item) choices that changed
+        np.bitwise_xor.at(hashes, rows, self.choice_keys(items, old_choices) ^ self.choice_keys(items, new_choices))
+
+
+class LRUCache:
+    """
+    Bounded mapping that evicts the least recently used entry once max_size is reached,
+    with hit/miss/eviction counters. Used for psoV3's tabu store and demand cache
+    and for the cover cache of aisle_cover.
+    """
+
+    def __init__(self, max_size=100_000):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return True
+        self.misses += 1
+        return False
+
+    def get(self, key, default=None):
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key]
+        self.misses += 1
+        return default
+
+    def put(self, key, value=True):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        return {"size": len(self.entries), "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
@@ -1,10 +1,31 @@
+import itertools
+import multiprocessing
+import os
 import random
+import sys
+import time
+import numpy as np
 from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from itertools import combinations
 import explorer
+from instance import load_instance, row_sums, csr_positions
+from reduction import reduce_instance
+from budget import CHALLENGE_TIME_LIMIT, Deadline
+from aisle_cover import cover_engine
+from bitset import aisle_bitsets
+import instrumentation
+from solution_io import write_solution
+from bounds import capacity_bound, format_gap, reached
+from local_search import aisle_gains, iterated_local_search, MAX_KICKS
 import copy
 import json
 
+OUTPUT_FILE = "best_solution.txt"
+
+# Length of the tasks of a time-limited run: the incumbent reaches the checkpoint at least this often
+TASK_SECONDS = 5.0
+
 
 class Solution:
     def __init__(self,batch_order,batch_items,aisle_assig,aisle_visited, eficency):
@@ -14,40 +35,43 @@ class Solution:
         self.aisle_visited = aisle_visited
         self.eficency = eficency
 
-def grasp_aisle_based_batch(warehouse, orders, min_items, max_items, iterations=100, max_aisles_to_visit=10, top_k_aisles=10):
+def grasp_aisle_based_batch(inst, iterations=100, max_aisles_to_visit=10, top_k_aisles=10, order_rcl_size=5, rng=None, deadline=None,
+                            upper_bound=None, max_kicks=MAX_KICKS):
+    # iterations=None runs until the deadline expires; the search also stops once the incumbent
+    # meets upper_bound (the capacity bound of bounds.py by default)
+    rng = random if rng is None else rng
+    deadline = Deadline() if deadline is None else deadline
+    upper_bound = capacity_bound(inst)[0] if upper_bound is None else upper_bound
     best_solution = None
     best_efficiency = 0
 
-    all_aisles = set()
-    aisle_total_stock = defaultdict(int)
+    aisle_total_stock = row_sums(inst.aisle_indptr, inst.aisle_qty)
+    stocked = aisle_bitsets(inst).stocked
 
-    for item_data in warehouse.values():
-        for aisle, qty in item_data.items():
-            aisle_total_stock[aisle] += qty
-            all_aisles.add(aisle)
+    aisle_list = [a for a in np.argsort(-aisle_total_stock, kind="stable").tolist() if stocked >> a & 1]
 
-    sorted_aisles = sorted(aisle_total_stock.items(), key=lambda x: -x[1])
-    aisle_list = [a for a, _ in sorted_aisles]
+    for it in itertools.count() if iterations is None else range(iterations):
+        if deadline.expired():
+            break
 
-    for it in range(iterations):
-        num_aisles_to_pick = random.randint(1, max_aisles_to_visit)
+        num_aisles_to_pick = rng.randint(1, max_aisles_to_visit)
         rcl_size = min(top_k_aisles, len(aisle_list))
         candidate_aisles = aisle_list[:rcl_size]
 
-        selected_aisles = set(random.sample(candidate_aisles, num_aisles_to_pick))
+        selected_aisles = rng.sample(candidate_aisles, min(num_aisles_to_pick, rcl_size))
 
-        solution = build_batch_from_aisles(selected_aisles, warehouse, orders, min_items, max_items)
+        with instrumentation.timer("grasp.construction"):
+            solution = build_batch_from_aisles(selected_aisles, inst, rng, order_rcl_size)
+        instrumentation.count("grasp.constructions")
 
         if solution is None:
+            instrumentation.count("grasp.construction_failures")
             continue
 
         batch_orders, batch_items, aisle_assignment, aisles_visited, efficiency = solution
 
-        improved_solution = local_search_aisles(
-            selected_aisles, warehouse, orders, min_items, max_items,
-            batch_orders, batch_items, aisle_assignment, aisles_visited, efficiency,
-            all_aisles
-        )
+        with instrumentation.timer("grasp.local_search"):
+            improved_solution = improve_batch(inst, batch_orders, aisles_visited, efficiency, rng, deadline, max_kicks)
 
         if improved_solution is not None:
             batch_orders, batch_items, aisle_assignment, aisles_visited, efficiency = improved_solution
@@ -55,40 +79,155 @@ def grasp_aisle_based_batch(warehouse, orders, min_items, max_items, iterations=
         if efficiency > best_efficiency:
             best_efficiency = efficiency
             best_solution = (batch_orders, batch_items, aisle_assignment, aisles_visited, efficiency)
-            #salvar melhor solução na classe data
-
-
-    return best_solution
-
-def build_batch_from_aisles(selected_aisles, warehouse, orders, min_items, max_items):
-    aisle_item_stock = defaultdict(int)
-    for item, aisle_data in warehouse.items():
-        for aisle, qty in aisle_data.items():
-            if aisle in selected_aisles:
-                aisle_item_stock[item] += qty
-
-    batch_orders = set()
-    batch_items = defaultdict(int)
-
-    for order_idx, order in enumerate(orders):
-        feasible = True
-        for item, qty in order.items():
-            if aisle_item_stock[item] < qty:
-                feasible = False
+            deadline.improved(best_solution)
+            instrumentation.incumbent(efficiency, "graspV2")
+            if reached(best_efficiency, upper_bound):
                 break
 
-        if feasible:
-            batch_orders.add(order_idx)
-            for item, qty in order.items():
-                batch_items[item] += qty
-                aisle_item_stock[item] -= qty
-
-    total_items = sum(batch_items.values())
+    deadline.flush()
+    return best_solution
 
-    if total_items < min_items or total_items > max_items:
-        return None
+# Instance shared by the GRASP worker processes, memory-mapped from the binary cache,
+# and the event the parent sets to stop every worker once the bound is met
+_worker_instance = None
+_worker_stop = None
+
+def _init_grasp_worker(input_file, reduce=False, stop=None):
+    global _worker_instance, _worker_stop
+    _worker_instance = load_instance(input_file)
+    if reduce:
+        _worker_instance = reduce_instance(_worker_instance).instance
+    _worker_stop = stop
+
+def _grasp_worker(iterations, seed, end_time, grasp_kwargs, instrument=False):
+    # Returns (solution, recorder of the task when instrumenting, else None)
+    recorder = instrumentation.activate() if instrument else None
+    rng = random.Random(seed)
+    deadline = Deadline(None if end_time is None else end_time - time.time(), stop=_worker_stop)
+    solution = grasp_aisle_based_batch(_worker_instance, iterations=iterations, rng=rng, deadline=deadline, **grasp_kwargs)
+    if instrument:
+        instrumentation.deactivate()
+    return solution, recorder
+
+def original_solution(reduction, solution):
+    # Solution of the reduced instance in the ids of the original one
+    batch_orders, _, aisle_assignment, aisles_visited, efficiency = solution
+    orders, aisles = reduction.map_back(sorted(batch_orders), sorted(aisles_visited))
+    order_mask = np.zeros(reduction.original.n_orders, dtype=bool)
+    order_mask[orders] = True
+    item_ids, aisle_ids = reduction.item_ids.tolist(), reduction.aisle_ids.tolist()
+    assignment = {item_ids[item]: [(aisle_ids[aisle], qty) for aisle, qty in picks] for item, picks in aisle_assignment.items()}
+    return set(orders), reduction.original.demand(order_mask), assignment, set(aisles), efficiency
+
+def _grasp_tasks(iterations, task_size, end_time):
+    # (iterations, end_time) of every task, built as it is submitted: chunks of task_size
+    # iterations, or with iterations=None slices of TASK_SECONDS until end_time
+    if iterations is not None:
+        for start in range(0, iterations, task_size):
+            yield min(task_size, iterations - start), end_time
+        return
+    while time.time() < end_time:
+        yield None, min(end_time, time.time() + TASK_SECONDS)
+
+def parallel_grasp(input_file, iterations=100, workers=None, seed=None, task_size=5,
+                   time_limit=None, checkpoint=None, reduce=False, **grasp_kwargs):
+    """
+    Multi-start GRASP spread over a process pool. The iterations are split into
+    tasks of `task_size` iterations, each with its own RNG stream spawned from
+    `seed`, so the result does not depend on the number of workers. Workers
+    memory-map the cached instance instead of receiving a pickled copy.
+    With iterations=None the workers run tasks of TASK_SECONDS each, resubmitted until
+    time_limit (CHALLENGE_TIME_LIMIT by default) seconds have passed.
+    New incumbents are handed to checkpoint(solution) as the tasks finish, so in both
+    modes they are reported while the search runs. Once one meets the upper bound, a
+    shared event stops the running tasks and no new task is submitted.
+    With reduce=True the workers search the reduced instance (reduction.py); solutions
+    are returned in the original ids.
+    """
+    workers = workers or os.cpu_count() or 1
+    if iterations is None and time_limit is None:
+        time_limit = CHALLENGE_TIME_LIMIT
+    deadline = Deadline(time_limit, checkpoint)
+    end_time = None if time_limit is None else time.time() + time_limit
+    inst = load_instance(input_file)  # compile the cache once before the workers map it
+    reduction = reduce_instance(inst) if reduce else None
+    upper_bound = grasp_kwargs.setdefault("upper_bound", capacity_bound(inst if reduction is None else reduction.instance)[0])
+
+    tasks = enumerate(_grasp_tasks(iterations, task_size, end_time))
+    seeds = np.random.SeedSequence(seed)
+
+    # Hooks active in this process are also recorded in the workers and merged back
+    recorder = instrumentation.active()
+
+    best_solution, best_task = None, None
+    context = multiprocessing.get_context()
+    stop = context.Event()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_grasp_worker,
+                             initargs=(input_file, reduce, stop)) as executor:
+        running = {}
+        def submit(count):
+            for task, (task_iterations, task_end) in itertools.islice(tasks, count):
+                task_seed = int(seeds.spawn(1)[0].generate_state(1)[0])
+                running[executor.submit(_grasp_worker, task_iterations, task_seed, task_end, grasp_kwargs,
+                                        recorder is not None)] = task
+
+        submit(workers)
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                task = running.pop(future)
+                solution, task_recorder = future.result()
+                if task_recorder is not None:
+                    recorder.merge(task_recorder)
+                # Ties go to the earlier task, as if the tasks had finished in order
+                if solution is None or (best_solution is not None and
+                                        (solution[4], -task) <= (best_solution[4], -best_task)):
+                    continue
+                best_solution = solution if reduction is None else original_solution(reduction, solution)
+                best_task = task
+                deadline.improved(best_solution)
+                if reached(best_solution[4], upper_bound):
+                    stop.set()
+            if not stop.is_set():
+                submit(len(done))
+
+    deadline.flush()
+    return best_solution
 
-    aisle_assignment, aisles_visited = assign_aisles_for_batch(batch_items, warehouse)
+def build_batch_from_aisles(selected_aisles, inst, rng=None, rcl_size=5):
+    """
+    Bound-aware wave construction from a seed set of aisles. Orders fitting the seed stock
+    are added through an RCL (fill_wave) that never overflows wave_size_ub; while the wave
+    is below wave_size_lb, the aisle letting in the most units of orders that are one new
+    aisle away is opened (drawn from the rcl_size best) and the fill resumes.
+    """
+    rng = random if rng is None else rng
+    seed_aisles = list(selected_aisles)
+    aisle_mask = np.zeros(inst.n_aisles, dtype=bool)
+    aisle_mask[seed_aisles] = True
+    stock = inst.supply(seed_aisles)
+    batch_mask = np.zeros(inst.n_orders, dtype=bool)
+
+    candidates = inst.orders_with_items(np.nonzero(stock)[0])
+    room = fill_wave(inst, stock, batch_mask, inst.wave_size_ub, candidates, rng, rcl_size)
+
+    while inst.wave_size_ub - room < inst.wave_size_lb:
+        gains = aisle_gains(inst, stock, batch_mask, room, aisle_mask)
+        ranked = [a for a in np.argsort(-gains, kind="stable")[:rcl_size].tolist() if gains[a] > 0]
+        if not ranked:
+            return None
+
+        aisle = rng.choice(ranked)
+        aisle_mask[aisle] = True
+        items, qty = inst.aisle(aisle)
+        stock[items] += qty
+        room = fill_wave(inst, stock, batch_mask, room, inst.orders_with_items(items), rng, rcl_size)
+
+    batch_orders = set(np.nonzero(batch_mask)[0].tolist())
+    batch_items = inst.demand(batch_mask)
+    total_items = int(batch_items.sum())
+
+    aisle_assignment, aisles_visited = assign_aisles_for_batch(batch_items, inst)
     if aisle_assignment is None:
         return None
 
@@ -96,91 +235,99 @@ def build_batch_from_aisles(selected_aisles, warehouse, orders, min_items, max_i
 
     return batch_orders, batch_items, aisle_assignment, aisles_visited, efficiency
 
-def assign_aisles_for_batch(batch_items, warehouse):
-    aisle_assignment = {}
-    visited_aisles = set()
-
-    for item, required_qty in batch_items.items():
-        remaining_qty = required_qty
-        aisle_qty_list = []
-
-        aisles_with_stock = sorted(
-            warehouse[item].items(), key=lambda x: -x[1]
-        )
-
-        for aisle, available_qty in aisles_with_stock:
-            if remaining_qty <= 0:
-                break
-
-            pick_qty = min(available_qty, remaining_qty)
-            remaining_qty -= pick_qty
-            aisle_qty_list.append((aisle, pick_qty))
-            visited_aisles.add(aisle)
-
-        if remaining_qty > 0:
-            return None, None
-
-        aisle_assignment[item] = aisle_qty_list
-
-    return aisle_assignment, visited_aisles
-
-def local_search_aisles(selected_aisles, warehouse, orders, min_items, max_items,
-                        current_orders, current_items, current_assignment, current_visited, current_efficiency,
-                        all_aisles):
-
-    best_solution = (
-        current_orders, current_items, current_assignment, current_visited, current_efficiency
-    )
-
-    improved = True
-    while improved:
-        improved = False
-        neighbors = []
-
-        for aisle in all_aisles - selected_aisles:
-            new_aisles = selected_aisles | {aisle}
-            neighbors.append(new_aisles)
-
-        if len(selected_aisles) > 1:
-            for aisle in selected_aisles:
-                new_aisles = selected_aisles - {aisle}
-                neighbors.append(new_aisles)
-
-        for neighbor_aisles in neighbors:
-            result = build_batch_from_aisles(neighbor_aisles, warehouse, orders, min_items, max_items)
-
-            if result is None:
-                continue
-
-            batch_orders, batch_items, aisle_assignment, aisles_visited, efficiency = result
+def fill_wave(inst, stock, batch_mask, room, candidates, rng, rcl_size):
+    """
+    Adds candidate orders to the wave while they fit the remaining stock and the `room`
+    left under wave_size_ub, consuming the stock. Candidates are ranked by decreasing
+    units and every pick is drawn among the first rcl_size still open; orders that would
+    overflow are skipped. Returns the room left.
+    """
+    candidates = candidates[~batch_mask[candidates]]
+    candidates = candidates[inst.orders_fitting(stock, candidates)]
+    if len(candidates) == 0:
+        return room
+
+    # Everything fits at once when the candidates neither overflow the room nor compete for stock
+    positions = csr_positions(inst.order_indptr, candidates)
+    demand = np.bincount(inst.order_items[positions], weights=inst.order_qty[positions], minlength=inst.n_items)
+    order_units = inst.order_units
+    if order_units[candidates].sum() <= room and np.all(demand <= stock):
+        batch_mask[candidates] = True
+        stock -= demand.astype(stock.dtype)
+        return room - int(order_units[candidates].sum())
+
+    remaining = candidates[np.argsort(-order_units[candidates], kind="stable")].tolist()
+    while remaining and order_units[remaining[-1]] <= room:
+        order_idx = remaining.pop(rng.randrange(min(rcl_size, len(remaining))))
+        if order_units[order_idx] > room:
+            continue
+        items, qty = inst.order(order_idx)
+        if np.all(stock[items] >= qty):
+            batch_mask[order_idx] = True
+            stock[items] -= qty
+            room -= int(order_units[order_idx])
+    return room
+
+def assign_aisles_for_batch(batch_items, inst, allowed_aisles=None):
+    # Smallest aisle set found by the cover engine, then every item is picked from those
+    # aisles by decreasing stock until its demand is covered
+    cover = cover_engine(inst).cover(batch_items, allowed_aisles)
+    if cover is None:
+        return None, None
+
+    indptr, aisles, stock = inst.item_aisles_by_stock()
+    usable = np.zeros(inst.n_aisles, dtype=bool)
+    usable[cover] = True
+    stock = np.where(usable[aisles], stock, 0)
+
+    required = np.repeat(batch_items, np.diff(indptr))
+    cumulative = np.concatenate(([0], np.cumsum(stock)))
+    if np.any(batch_items > cumulative[indptr[1:]] - cumulative[indptr[:-1]]):
+        return None, None
+
+    taken_before = cumulative[:-1] - np.repeat(cumulative[indptr[:-1]], np.diff(indptr))
+    picked = (required > 0) & (taken_before < required) & (stock > 0)
+
+    aisle_assignment = defaultdict(list)
+    items = np.repeat(np.arange(inst.n_items), np.diff(indptr))[picked]
+    pick_qty = np.minimum(stock, required - taken_before)[picked]
+    for item, aisle, qty in zip(items.tolist(), aisles[picked].tolist(), pick_qty.tolist()):
+        aisle_assignment[item].append((aisle, qty))
+
+    return dict(aisle_assignment), set(aisles[picked].tolist())
+
+def improve_batch(inst, batch_orders, aisles_visited, efficiency, rng=None, deadline=None, max_kicks=MAX_KICKS):
+    # Iterated local search (local_search.py) from a constructed wave; None unless it improves it
+    orders, aisle_mask, objective = iterated_local_search(inst, batch_orders, aisles_visited, rng, deadline, max_kicks)
+    if objective <= efficiency:
+        return None
 
-            if efficiency > best_solution[4]:  
-                best_solution = (batch_orders, batch_items, aisle_assignment, aisles_visited, efficiency)
-                selected_aisles = neighbor_aisles
-                improved = True
-                break 
+    order_mask = np.zeros(inst.n_orders, dtype=bool)
+    order_mask[list(orders)] = True
+    batch_items = inst.demand(order_mask)
+    aisle_assignment, aisles_visited = assign_aisles_for_batch(batch_items, inst, aisle_mask)
+    efficiency = int(batch_items.sum()) / len(aisles_visited)
 
-    return best_solution if best_solution[4] > current_efficiency else None
+    return orders, batch_items, aisle_assignment, aisles_visited, efficiency
 
-def write_solution_to_file(batch_orders, aisle_assignment, aisles_visited, filename="best_solution.txt"):
-    with open(filename, "w") as file:
-        file.write(f"{len(batch_orders)}\n")
-        for order_idx in sorted(batch_orders):
-            file.write(f"{order_idx}\n")
 
-        file.write(f"{len(aisles_visited)}\n")
-        for aisle in sorted(aisles_visited):
-            file.write(f"{aisle}\n")
 
 if __name__ == "__main__":
-    orders, warehouse, min_items, max_items = explorer.parse()
-    solution = grasp_aisle_based_batch(warehouse, orders, min_items, max_items, iterations=50)
+    # python graspV2.py [input_file] [workers] [time_limit]
+    input_file = sys.argv[1] if len(sys.argv) > 1 else f"{explorer.path}/instance_0005.txt"
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    time_limit = float(sys.argv[3]) if len(sys.argv) > 3 else None
+
+    checkpoint = lambda incumbent: write_solution(OUTPUT_FILE, incumbent[0], incumbent[3])
+    solution = parallel_grasp(input_file, iterations=None if time_limit else 50, workers=workers, seed=0,
+                              time_limit=time_limit, checkpoint=checkpoint, reduce=True)
 
     if solution:
         batch_orders, batch_items, aisle_assignment, aisles_visited, efficiency = solution
         print("Best efficiency:", efficiency)
+        print(format_gap(efficiency, capacity_bound(load_instance(input_file))[0]))
         print("Orders selected:", batch_orders)
         print("Aisles visited:", aisles_visited)
-        write_solution_to_file(batch_orders, aisle_assignment, aisles_visited)
+        write_solution(OUTPUT_FILE, batch_orders, aisles_visited)
     else:
         print("No valid batch found.")
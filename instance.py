@@ -0,0 +1,304 @@
+import hashlib
+import json
+import os
+import numpy as np
+
+# Arrays persisted by the binary instance cache
+CACHE_ARRAYS = (
+    "order_indptr", "order_items", "order_qty",
+    "aisle_indptr", "aisle_items", "aisle_qty",
+    "order_units", "order_rows", "item_stock",
+)
+CACHE_VERSION = 1
+
+
+class Instance:
+    """
+    Wave order picking instance stored as compressed sparse row arrays:
+    - order x item: order_indptr, order_items, order_qty
+    - aisle x item: aisle_indptr, aisle_items, aisle_qty
+    - order_units: total units of each order
+    """
+
+    def __init__(self, n_items, order_indptr, order_items, order_qty,
+                 aisle_indptr, aisle_items, aisle_qty, wave_size_lb, wave_size_ub,
+                 order_units=None, order_rows=None, item_stock=None):
+        self.n_orders = len(order_indptr) - 1
+        self.n_items = int(n_items)
+        self.n_aisles = len(aisle_indptr) - 1
+
+        self.order_indptr = order_indptr
+        self.order_items = order_items
+        self.order_qty = order_qty
+
+        self.aisle_indptr = aisle_indptr
+        self.aisle_items = aisle_items
+        self.aisle_qty = aisle_qty
+
+        self.wave_size_lb = int(wave_size_lb)
+        self.wave_size_ub = int(wave_size_ub)
+
+        if order_units is None:
+            order_units = row_sums(order_indptr, order_qty)
+        self.order_units = order_units
+
+        # Row (order) of every order x item nonzero and total stock of every item
+        if order_rows is None:
+            order_rows = np.repeat(np.arange(self.n_orders, dtype=np.int32), np.diff(order_indptr))
+        if item_stock is None:
+            item_stock = np.bincount(aisle_items, weights=aisle_qty, minlength=self.n_items).astype(np.int64)
+        self.order_rows = order_rows
+        self.item_stock = item_stock
+
+        self._item_aisles = None
+        self._item_aisles_by_stock = None
+        self._item_orders = None
+
+    def order(self, o):
+        start, end = self.order_indptr[o], self.order_indptr[o + 1]
+        return self.order_items[start:end], self.order_qty[start:end]
+
+    def aisle(self, a):
+        start, end = self.aisle_indptr[a], self.aisle_indptr[a + 1]
+        return self.aisle_items[start:end], self.aisle_qty[start:end]
+
+    def item_aisles(self):
+        # item x aisle CSR (transpose of the aisle matrix), built on first use
+        if self._item_aisles is None:
+            self._item_aisles = csr_transpose(self.aisle_indptr, self.aisle_items, self.aisle_qty, self.n_items)
+        return self._item_aisles
+
+    def item_orders(self):
+        # item x order CSR (inverted index of the orders containing each item), built on first use
+        if self._item_orders is None:
+            self._item_orders = csr_transpose(self.order_indptr, self.order_items, self.order_qty, self.n_items)
+        return self._item_orders
+
+    def orders_with_items(self, items):
+        # Sorted ids of the orders containing at least one of the given items
+        indptr, orders, _ = self.item_orders()
+        return np.unique(orders[csr_positions(indptr, np.asarray(items, dtype=np.int64))])
+
+    def item_aisles_by_stock(self):
+        # item x aisle CSR with the aisles of every item sorted by decreasing stock
+        if self._item_aisles_by_stock is None:
+            indptr, aisles, qty = self.item_aisles()
+            rows = np.repeat(np.arange(self.n_items), np.diff(indptr))
+            perm = np.lexsort((-qty, rows))
+            self._item_aisles_by_stock = indptr, aisles[perm], qty[perm]
+        return self._item_aisles_by_stock
+
+    def orders_fitting(self, stock, orders=None):
+        # Mask of the orders (all, or the given ids) whose every item is covered by the stock vector
+        if orders is None:
+            short = self.order_rows[stock[self.order_items] < self.order_qty]
+            return np.bincount(short, minlength=self.n_orders) == 0
+
+        positions = csr_positions(self.order_indptr, orders)
+        rows = np.repeat(np.arange(len(orders)), self.order_indptr[orders + 1] - self.order_indptr[orders])
+        short = rows[stock[self.order_items[positions]] < self.order_qty[positions]]
+        return np.bincount(short, minlength=len(orders)) == 0
+
+    def demand(self, order_mask):
+        # Units of every item required by the orders selected in a 0/1 mask
+        selected = order_mask[self.order_rows].astype(bool)
+        return np.bincount(self.order_items[selected], weights=self.order_qty[selected],
+                           minlength=self.n_items).astype(np.int64)
+
+    def supply(self, selected_aisles):
+        # Units of every item stocked across the given aisles
+        stock = np.zeros(self.n_items, dtype=np.int64)
+        for a in selected_aisles:
+            items, qty = self.aisle(a)
+            stock[items] += qty
+        return stock
+
+    def order_dicts(self):
+        # [{item: qty}] per order, the shape used by explorer.parse and checker
+        return csr_to_dicts(self.order_indptr, self.order_items, self.order_qty)
+
+    def aisle_dicts(self):
+        # [{item: qty}] per aisle
+        return csr_to_dicts(self.aisle_indptr, self.aisle_items, self.aisle_qty)
+
+    def aisle_book(self):
+        # {item: {aisle: qty}} for every stocked item, the shape used by explorer.parse
+        aisle_book = {}
+        for a, stock in enumerate(self.aisle_dicts()):
+            for item, qty in stock.items():
+                aisle_book.setdefault(item, {})[a] = qty
+        return aisle_book
+
+
+def row_sums(indptr, data):
+    sums = np.zeros(len(indptr) - 1, dtype=np.int64)
+    nonempty = indptr[1:] > indptr[:-1]
+    if nonempty.any():
+        sums[nonempty] = np.add.reduceat(data, indptr[:-1][nonempty])
+    return sums
+
+
+def csr_positions(indptr, rows):
+    # Positions in indices/data of the nonzeros of the given rows, row after row
+    starts = indptr[rows]
+    counts = indptr[rows + 1] - starts
+    offsets = np.repeat(starts - np.cumsum(counts) + counts, counts)
+    return offsets + np.arange(offsets.size)
+
+
+def csr_transpose(indptr, indices, data, n_cols):
+    rows = np.repeat(np.arange(len(indptr) - 1, dtype=np.int32), np.diff(indptr))
+    perm = np.argsort(indices, kind="stable")
+    t_indptr = np.zeros(n_cols + 1, dtype=np.int64)
+    np.cumsum(np.bincount(indices, minlength=n_cols), out=t_indptr[1:])
+    return t_indptr, rows[perm], data[perm]
+
+
+def csr_to_dicts(indptr, indices, data):
+    indptr = indptr.tolist()
+    indices = indices.tolist()
+    data = data.tolist()
+    return [dict(zip(indices[indptr[r]:indptr[r + 1]], data[indptr[r]:indptr[r + 1]]))
+            for r in range(len(indptr) - 1)]
+
+
+def _read_rows(tokens, pos, n_rows):
+    # Each row is "k item_1 qty_1 ... item_k qty_k"
+    starts = np.empty(n_rows, dtype=np.int64)
+    counts = np.empty(n_rows, dtype=np.int64)
+    for r in range(n_rows):
+        k = tokens[pos]
+        starts[r] = pos + 1
+        counts[r] = k
+        pos += 1 + 2 * k
+
+    indptr = np.zeros(n_rows + 1, dtype=np.int64)
+    np.cumsum(counts, out=indptr[1:])
+    offsets = np.arange(indptr[-1], dtype=np.int64) - np.repeat(indptr[:-1], counts)
+    return indptr, np.repeat(starts, counts) + 2 * offsets, pos
+
+
+def read_instance(file_path):
+    with open(file_path, "r") as file:
+        tokens = file.read().split()
+    tokens = list(map(int, tokens))
+
+    n_orders, n_items, n_aisles = tokens[0], tokens[1], tokens[2]
+    order_indptr, order_pos, pos = _read_rows(tokens, 3, n_orders)
+    aisle_indptr, aisle_pos, pos = _read_rows(tokens, pos, n_aisles)
+    wave_size_lb, wave_size_ub = tokens[pos], tokens[pos + 1]
+
+    values = np.array(tokens, dtype=np.int64)
+    return Instance(
+        n_items,
+        order_indptr, values[order_pos].astype(np.int32), values[order_pos + 1],
+        aisle_indptr, values[aisle_pos].astype(np.int32), values[aisle_pos + 1],
+        wave_size_lb, wave_size_ub,
+    )
+
+
+def _file_sha1(file_path):
+    sha1 = hashlib.sha1()
+    with open(file_path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            sha1.update(block)
+    return sha1.hexdigest()
+
+
+def cache_path(file_path, cache_dir=None):
+    # Sidecar directory holding the cached arrays of an instance file
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(file_path)), ".cache")
+    return os.path.join(cache_dir, os.path.splitext(os.path.basename(file_path))[0])
+
+
+def compile_instance(file_path, cache_dir=None):
+    """
+    Parses a text instance and stores its arrays as .npy files in the cache directory.
+    The metadata file is written last, so a partially written cache is never used.
+    """
+    inst = read_instance(file_path)
+    target = cache_path(file_path, cache_dir)
+    os.makedirs(target, exist_ok=True)
+    try:
+        os.remove(os.path.join(target, "meta.json"))
+    except FileNotFoundError:
+        pass
+
+    suffix = f".tmp{os.getpid()}"
+    for name in CACHE_ARRAYS:
+        tmp = os.path.join(target, f"{name}{suffix}.npy")
+        np.save(tmp, np.ascontiguousarray(getattr(inst, name)))
+        os.replace(tmp, os.path.join(target, f"{name}.npy"))
+
+    stat = os.stat(file_path)
+    meta = {
+        "version": CACHE_VERSION,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha1": _file_sha1(file_path),
+        "n_items": inst.n_items,
+        "wave_size_lb": inst.wave_size_lb,
+        "wave_size_ub": inst.wave_size_ub,
+    }
+    _write_meta(target, meta)
+    return inst
+
+
+def _write_meta(target, meta):
+    tmp = os.path.join(target, f"meta.json.tmp{os.getpid()}")
+    with open(tmp, "w") as file:
+        json.dump(meta, file)
+    os.replace(tmp, os.path.join(target, "meta.json"))
+
+
+def _read_meta(target):
+    try:
+        with open(os.path.join(target, "meta.json"), "r") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def load_instance(file_path, cache_dir=None, mmap=True):
+    """
+    Loads an instance through its binary cache, compiling it first if the cache is
+    missing or stale. The cache is valid when the source size and mtime match, or
+    failing that, when its SHA-1 still matches (the mtime is then refreshed).
+    With mmap=True the arrays are memory-mapped read-only, so processes loading the
+    same instance share the same pages.
+    """
+    target = cache_path(file_path, cache_dir)
+    meta = _read_meta(target)
+    stat = os.stat(file_path)
+
+    try:
+        if meta is None or meta.get("version") != CACHE_VERSION or meta["size"] != stat.st_size:
+            return compile_instance(file_path, cache_dir)
+
+        if meta["mtime_ns"] != stat.st_mtime_ns:
+            if meta["sha1"] != _file_sha1(file_path):
+                return compile_instance(file_path, cache_dir)
+            meta["mtime_ns"] = stat.st_mtime_ns
+            _write_meta(target, meta)
+
+        mmap_mode = "r" if mmap else None
+        # Plain ndarray views of the memmaps: same shared pages, without np.memmap's slicing overhead
+        arrays = {name: np.load(os.path.join(target, f"{name}.npy"), mmap_mode=mmap_mode).view(np.ndarray)
+                  for name in CACHE_ARRAYS}
+    except (OSError, ValueError):
+        # Unwritable or corrupt cache: fall back to parsing the text file
+        return read_instance(file_path)
+
+    return Instance(meta["n_items"], wave_size_lb=meta["wave_size_lb"], wave_size_ub=meta["wave_size_ub"], **arrays)
+
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) < 2:
+        print("Usage: python instance.py <input_file> [<input_file> ...]")
+        sys.exit(1)
+
+    for input_file in sys.argv[1:]:
+        compile_instance(input_file)
+        print(f"Compiled {input_file} -> {cache_path(input_file)}")
@@ -0,0 +1,161 @@
+import contextlib
+import cProfile
+import io
+import json
+import pstats
+import runpy
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+
+_NULL_TIMER = contextlib.nullcontext()
+
+
+class Recorder:
+    """
+    Counters, cumulative timers and an incumbent-vs-time trace filled by the solvers'
+    hot points through the module functions below while the recorder is active.
+    """
+
+    def __init__(self):
+        self.start = time.monotonic()
+        self.counters = defaultdict(int)
+        self.timers = defaultdict(float)
+        self.timer_calls = defaultdict(int)
+        self.trace = []
+        self.profiles = []
+
+    def elapsed(self):
+        return time.monotonic() - self.start
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    @contextlib.contextmanager
+    def timer(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timers[name] += time.perf_counter() - start
+            self.timer_calls[name] += 1
+
+    def incumbent(self, objective, source=None):
+        self.trace.append({"time": round(self.elapsed(), 6), "objective": float(objective), "source": source})
+
+    def merge(self, other):
+        # Adds the counters, timers and trace of a recorder filled in another process
+        for name, value in other.counters.items():
+            self.counters[name] += value
+        for name, seconds in other.timers.items():
+            self.timers[name] += seconds
+            self.timer_calls[name] += other.timer_calls[name]
+        shift = other.start - self.start  # monotonic clocks are shared between processes
+        self.trace.extend({**event, "time": round(event["time"] + shift, 6)} for event in other.trace)
+        self.trace.sort(key=lambda event: event["time"])
+
+    def records(self, **meta):
+        # One dict per JSONL line: incumbents in time order, then counters, timers and profiles
+        for event in self.trace:
+            yield {"type": "incumbent", **meta, **event}
+        for name, value in sorted(self.counters.items()):
+            yield {"type": "counter", **meta, "name": name, "value": value}
+        for name, seconds in sorted(self.timers.items()):
+            yield {"type": "timer", **meta, "name": name, "seconds": round(seconds, 6), "calls": self.timer_calls[name]}
+        for profile in self.profiles:
+            yield {"type": "profile", **meta, **profile}
+
+    def export_jsonl(self, path, **meta):
+        with open(path, "a") as file:
+            for record in self.records(**meta):
+                file.write(json.dumps(record) + "\n")
+
+
+# Recorder the hooks write to; None keeps every hook a no-op
+_active = None
+
+
+def activate(recorder=None):
+    global _active
+    _active = Recorder() if recorder is None else recorder
+    return _active
+
+
+def active():
+    return _active
+
+
+def deactivate():
+    global _active
+    recorder, _active = _active, None
+    return recorder
+
+
+def count(name, n=1):
+    if _active is not None:
+        _active.count(name, n)
+
+
+def timer(name):
+    return _NULL_TIMER if _active is None else _active.timer(name)
+
+
+def incumbent(objective, source=None):
+    if _active is not None:
+        _active.incumbent(objective, source)
+
+
+@contextlib.contextmanager
+def profile(recorder, cpu=True, memory=False, top=25):
+    """
+    Opt-in cProfile (cpu) and tracemalloc (memory) around a block; the top functions by
+    cumulative time and the top allocation sites are stored in recorder.profiles.
+    """
+    profiler = cProfile.Profile() if cpu else None
+    if memory:
+        tracemalloc.start()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            text = io.StringIO()
+            pstats.Stats(profiler, stream=text).sort_stats("cumulative").print_stats(top)
+            recorder.profiles.append({"kind": "cpu", "stats": text.getvalue()})
+        if memory:
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            sites = [str(stat) for stat in snapshot.statistics("lineno")[:top]]
+            recorder.profiles.append({"kind": "memory", "current_bytes": current, "peak_bytes": peak, "sites": sites})
+
+
+if __name__ == "__main__":
+    # python instrumentation.py [--profile] [--memory] [--output trace.jsonl] <solver.py> [solver args...]
+    # Runs the solver script as __main__ with the hooks recording; records are appended to the output.
+    args = sys.argv[1:]
+    cpu = "--profile" in args
+    memory = "--memory" in args
+    args = [a for a in args if a not in ("--profile", "--memory")]
+    output = "trace.jsonl"
+    if args[:1] == ["--output"]:
+        output, args = args[1], args[2:]
+    if not args:
+        print("Usage: python instrumentation.py [--profile] [--memory] [--output trace.jsonl] <solver.py> [args...]")
+        sys.exit(1)
+
+    # The solvers import this file as `instrumentation`, a different module object than __main__
+    import instrumentation
+
+    recorder = instrumentation.activate()
+    sys.argv = args
+    try:
+        with profile(recorder, cpu, memory) if cpu or memory else contextlib.nullcontext():
+            runpy.run_path(args[0], run_name="__main__")
+    finally:
+        instrumentation.deactivate()
+        recorder.export_jsonl(output, script=args[0], argv=args[1:])
+        print(f"Instrumentation records appended to {output}", file=sys.stderr)
@@ -1,96 +1,361 @@
+import os
 import random
+import sys
 import numpy as np
 import explorer
-from collections import defaultdict
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
 import pulp
+from budget import Deadline
+import instrumentation
+from bounds import capacity_bound, format_gap, reached, useful_stock, GAP_TOLERANCE
+from instance import load_instance
+from reduction import reduce_instance
+from solution_io import read_solution, write_solution
+from checker import WaveOrderPicking
+import graspV2
 
-# Data
+TIME_LIMIT = 60  # seconds given to CBC, which returns its incumbent when the limit is hit
+OUTPUT_FILE = "best_solution_lp.txt"
 
-orders, warehouse, lb, ub = explorer.parse()
 
-M = 10
-min_items = lb
-max_items = ub
+def build_model(orders, warehouse, min_items, max_items):
+    O = list(range(len(orders)))
+    I = list(set(i for order in orders for i in order))
+    A = list(set(a for aisles in warehouse.values() for a in aisles))
 
-O = list(range(len(orders)))
-I = list(set(i for order in orders for i in order))
-A = list(set(a for aisles in warehouse.values() for a in aisles))
+    model = pulp.LpProblem("Order_Batching_Aisle_Assignment", pulp.LpMaximize)
 
-model = pulp.LpProblem("Order_Batching_Aisle_Assignment", pulp.LpMaximize)
+    x = pulp.LpVariable.dicts("SelectOrder", O, cat="Binary") # X_o = 1 if the order o is selected 0 otherwise
+    y = pulp.LpVariable.dicts("VisitAisle", A, cat="Binary")  # Y_a = 1 if the aisle a is visited 0 otherwise
+    z = pulp.LpVariable.dicts("PickItemFromAisle", [(i, a) for i in I for a in A], cat="Binary") #Z_ia = 1 if the item i was picked from aisle a
 
-x = pulp.LpVariable.dicts("SelectOrder", O, cat="Binary") # X_o = 1 if the order o is selected 0 otherwise           
-y = pulp.LpVariable.dicts("VisitAisle", A, cat="Binary")  # Y_a = 1 if the aisle a is visited 0 otherwise   
-z = pulp.LpVariable.dicts("PickItemFromAisle", [(i, a) for i in I for a in A], cat="Binary") #Z_ia = 1 if the item i was picked from aisle a
+    total_items_picked = pulp.lpSum(
+        orders[o].get(i, 0) * x[o] for o in O for i in I
+    )
+    total_aisles_visited = pulp.lpSum(
+        y[a] for a in A
+    )
 
+    for i in I:
+        demand = pulp.lpSum(orders[o].get(i, 0) * x[o] for o in O) # how many items of the item i we have on the order
+        supply = pulp.lpSum(warehouse[i].get(a, 0) * z[(i, a)] for a in A) #how many units of the item i we have on the ailse a * if you picked that item from that isle
+        model += demand <= supply #number of picked items must be equal or less the number of items in the aisle
 
-total_items_picked = pulp.lpSum(
-    orders[o].get(i, 0) * x[o] for o in O for i in I
-)
-total_aisles_visited = pulp.lpSum(
-    y[a] for a in A
-)
+    # If you didnt visited the aisle you cannot retreive items from there
+    for i in I:
+        for a in A:
+            model += z[(i, a)] <= y[a]
 
-model += total_items_picked - M * total_aisles_visited
+    # If there is no item in the aisle we cannot retrieve that item from that aisle (optimazation)
+    for i in I:
+        for a in A:
+            if warehouse[i].get(a, 0) == 0:
+                model += z[(i, a)] == 0
 
-for i in I:
-    demand = pulp.lpSum(orders[o].get(i, 0) * x[o] for o in O) # how many items of the item i we have on the order
-    supply = pulp.lpSum(warehouse[i].get(a, 0) * z[(i, a)] for a in A) #how many units of the item i we have on the ailse a * if you picked that item from that isle
-    model += demand <= supply #number of picked items must be equal or less the number of items in the aisle
+    model += total_items_picked >= min_items
+    model += total_items_picked <= max_items
 
-# If you didnt visited the aisle you cannot retreive items from there
-for i in I:
-    for a in A:
-        model += z[(i, a)] <= y[a]
+    # The ratio objective is only defined when at least one aisle is visited
+    model += total_aisles_visited >= 1
 
-# If there is no item in the aisle we cannot retrieve that item from that aisle (optimazation)
-for i in I:
-    for a in A:
-        if warehouse[i].get(a, 0) == 0:
-            model += z[(i, a)] == 0
+    return model, x, y, total_items_picked, total_aisles_visited
 
-model += total_items_picked >= min_items
-model += total_items_picked <= max_items
 
-# Solve the model with CBC solver
-solver = pulp.PULP_CBC_CMD(msg=True)
-solver.timeLimit = 60
-model.solve(solver)
+def build_compact_model(inst, multiplicity=None):
+    """
+    Same model without the item x aisle z grid: the demand of every item is linked
+    directly to the stock of the visited aisles that hold it,
+        sum_o q_oi x_o <= sum_{a stocking i} u_ai y_a,
+    with one row per demanded item built straight from the CSR arrays.
+    `multiplicity` (from reduction.Reduction with merged orders) turns x_o into the
+    number of identical copies of order o picked, an integer in [0, multiplicity[o]].
+    """
+    model = pulp.LpProblem("Order_Batching_Aisle_Selection", pulp.LpMaximize)
+
+    if multiplicity is None:
+        x = pulp.LpVariable.dicts("SelectOrder", range(inst.n_orders), cat="Binary")
+    else:
+        x = {o: pulp.LpVariable(f"SelectOrder_{o}", 0, m, cat="Binary" if m == 1 else "Integer")
+             for o, m in enumerate(multiplicity.tolist())}
+    stocked_aisles = np.nonzero(np.diff(inst.aisle_indptr))[0].tolist()
+    y = pulp.LpVariable.dicts("VisitAisle", stocked_aisles, cat="Binary")
+
+    order_units = inst.order_units.tolist()
+    total_items_picked = pulp.LpAffineExpression([(x[o], order_units[o]) for o in x])
+    total_aisles_visited = pulp.LpAffineExpression([(y[a], 1) for a in y])
+
+    order_indptr, item_orders, order_qty = inst.item_orders()
+    aisle_indptr, item_aisles, aisle_qty = inst.item_aisles()
+    order_indptr, item_orders, order_qty = order_indptr.tolist(), item_orders.tolist(), order_qty.tolist()
+    aisle_indptr, item_aisles, aisle_qty = aisle_indptr.tolist(), item_aisles.tolist(), aisle_qty.tolist()
+
+    for i in range(inst.n_items):
+        start, end = order_indptr[i], order_indptr[i + 1]
+        if start == end:
+            continue
+        terms = [(x[o], q) for o, q in zip(item_orders[start:end], order_qty[start:end])]
+        start, end = aisle_indptr[i], aisle_indptr[i + 1]
+        terms += [(y[a], -u) for a, u in zip(item_aisles[start:end], aisle_qty[start:end])]
+        model += pulp.LpConstraint(pulp.LpAffineExpression(terms), pulp.LpConstraintLE, f"Supply_{i}", 0)
+
+    model += total_items_picked >= inst.wave_size_lb
+    model += total_items_picked <= inst.wave_size_ub
+
+    # The ratio objective is only defined when at least one aisle is visited
+    model += total_aisles_visited >= 1
+
+    return model, x, y, total_items_picked, total_aisles_visited
+
+
+def solve_parametric(model, x, y, total_items_picked, total_aisles_visited, lam, time_limit=TIME_LIMIT, start=None,
+                     cutoff=None):
+    """
+    Solves max units - lam * aisles. `start` is an optional (selected_orders, visited_aisles)
+    pair given to CBC as a MIP start, and `cutoff` an objective value below which CBC
+    prunes every node (CBC maximizes by minimizing the negated objective, so the option
+    is passed negated). Returns (selected_orders, visited_aisles) or None if CBC found no
+    feasible solution; an order with count variables is listed once per copy picked.
+    """
+    model.setObjective(total_items_picked - lam * total_aisles_visited)
+
+    if start is not None:
+        selected_orders, visited_aisles = Counter(start[0]), set(start[1])
+        for o, var in x.items():
+            var.setInitialValue(selected_orders[o])
+        for a, var in y.items():
+            var.setInitialValue(1 if a in visited_aisles else 0)
+
+    options = [] if cutoff is None else [f"cutoff {-cutoff}"]
+    solver = pulp.PULP_CBC_CMD(msg=False, timeLimit=time_limit, warmStart=start is not None, options=options)
+    model.solve(solver)
+
+    selected_orders = [o for o in x if x[o].varValue is not None for _ in range(int(round(x[o].varValue)))]
+    visited_aisles = [a for a in y if y[a].varValue is not None and y[a].varValue > 0.5]
+    if not visited_aisles or pulp.LpStatus[model.status] in ("Infeasible", "Undefined"):
+        return None
+    return selected_orders, visited_aisles
+
+
+def dinkelbach(inst, lam=0.0, max_iterations=50, tol=1e-6, time_limit=TIME_LIMIT, deadline=None, compact=True,
+               upper_bound=None, multiplicity=None, incumbent=None):
+    """
+    Dinkelbach's method for max units / aisles: solve max units - lam * aisles,
+    set lam to the ratio of the solution found and repeat, warm-starting every
+    solve from the previous wave, until the parametric optimum is ~0 (the wave is
+    then ratio-optimal) or the ratio stops increasing (time-limited solves).
+    compact=False uses the original formulation with the item x aisle z grid, and
+    multiplicity is handed to the compact model for instances with merged orders.
+    It also stops once the ratio meets upper_bound (the capacity bound by default).
+    A feasible (selected_orders, visited_aisles) incumbent, e.g. from a heuristic, starts
+    the iterations at its ratio as the first MIP start. Every warm-started solve runs at
+    lam = U / A, the ratio of its start, where a wave with a higher ratio has
+    units - lam * aisles >= 1 / A; half of that is passed as CBC's objective cutoff, so
+    nodes that cannot beat the incumbent are pruned, and a solve proven infeasible
+    proves the start ratio-optimal.
+    Returns (selected_orders, visited_aisles, ratio), or None if no wave was found.
+    """
+    deadline = Deadline(time_limit) if deadline is None else deadline
+    upper_bound = capacity_bound(inst, multiplicity)[0] if upper_bound is None else upper_bound
+    if compact:
+        model, x, y, units, aisles = build_compact_model(inst, multiplicity)
+    else:
+        model, x, y, units, aisles = build_model(inst.order_dicts(), inst.aisle_book(), inst.wave_size_lb, inst.wave_size_ub)
 
-selected_orders = []
-for o in O:
-    if x[o].varValue > 0.5:
-        print(f"Order {o}: {orders[o]}")
-        selected_orders.append(o)
+    order_units = inst.order_units.tolist()
+    best = None
+    start = None
+    proven = False
+    if incumbent is not None:
+        ratio = sum(order_units[o] for o in incumbent[0]) / len(incumbent[1])
+        best = (list(incumbent[0]), list(incumbent[1]), ratio)
+        lam, start = ratio, (best[0], best[1])
+        deadline.improved(best)
+        print(f"Incumbent ratio = {ratio:.6f}")
+    for iteration in range(max_iterations):
+        remaining = deadline.remaining()
+        if remaining is not None and remaining <= 0:
+            break
 
-visited_aisles = []
-for a in A:
-    if y[a].varValue > 0.5:
-        print(f"Aisle: {a}")
-        visited_aisles.append(a)
+        cutoff = None if start is None else 0.5 / len(start[1])
+        with instrumentation.timer("ip.solve"):
+            solution = solve_parametric(model, x, y, units, aisles, lam, time_limit=remaining, start=start, cutoff=cutoff)
+        instrumentation.count("ip.solves")
+        if solution is None:
+            # Only a complete search under the cutoff ends Infeasible; a time limit ends NotSolved
+            proven = cutoff is not None and model.status == pulp.LpStatusInfeasible
+            break
 
-def write_solution_to_file(selected_orders, visited_aisles, filename="best_solution_lp.txt"):
+        selected_orders, visited_aisles = solution
+        picked = sum(order_units[o] for o in selected_orders)
+        ratio = picked / len(visited_aisles)
+        print(f"Dinkelbach iteration {iteration + 1}: lambda = {lam:.6f}, ratio = {ratio:.6f}")
+
+        if best is None or ratio > best[2]:
+            best = (selected_orders, visited_aisles, ratio)
+            deadline.improved(best)
+            instrumentation.incumbent(ratio, "ip")
+
+        # F(lam) = picked - lam * aisles <= tol, the wave is ratio-optimal if CBC proved F(lam) optimal
+        if ratio <= lam + tol:
+            proven = model.sol_status == pulp.LpSolutionOptimal
+            break
+        if reached(ratio, upper_bound):
+            break
+
+        lam = ratio
+        start = solution
+
+    if best is not None:
+        print("Ratio-optimal, gap 0.00%" if proven else format_gap(best[2], upper_bound))
+    deadline.flush()
+    return best
+
+
+def solve_fixed_aisles(model, x, y, total_items_picked, total_aisles_visited, k, time_limit=TIME_LIMIT, start=None):
+    """
+    Solves max units subject to at most k visited aisles. The aisles carry a weight of
+    1 / (k + 1), below the value of one unit over k aisles, so CBC picks the most units
+    and then the fewest aisles. Returns (selected_orders, visited_aisles) or None.
+    """
+    if "AisleCount" in model.constraints:
+        del model.constraints["AisleCount"]
+    model += pulp.LpConstraint(total_aisles_visited, pulp.LpConstraintLE, "AisleCount", k)
+    return solve_parametric(model, x, y, total_items_picked, total_aisles_visited, 1 / (k + 1), time_limit, start)
+
+
+# Compact model of the instance, built once in every aisle-count worker process
+_k_worker_model = None
+
+def _init_k_worker(input_file, reduce=False):
+    global _k_worker_model
+    inst = load_instance(input_file)
+    if reduce:
+        reduction = reduce_instance(inst, merge_duplicates=True)
+        _k_worker_model = build_compact_model(reduction.instance, reduction.multiplicity)
+    else:
+        _k_worker_model = build_compact_model(inst)
+
+def _k_worker(k, time_limit, start):
+    with instrumentation.timer("ip.solve_k"):
+        return k, solve_fixed_aisles(*_k_worker_model, k, time_limit=time_limit, start=start)
+
+
+def aisle_count_enumeration(input_file, workers=None, time_limit=TIME_LIMIT, deadline=None, reduce=False, incumbent=None):
     """
-    Writes the IP/LP best solution to a file in the following format:
-    - number of orders selected
-    - list of selected orders
-    - number of aisles visited
-    - list of visited aisles
+    The optimal ratio is max_k units_k / k, with units_k the most units pickable from at
+    most k aisles. k runs upwards from the smallest aisle count that can hold
+    wave_size_lb units. k values are solved `workers` at a time in separate processes.
+    Each round is warm-started from the best wave so far, which is feasible for every
+    larger k. Once min(wave_size_ub, useful stock of the k best aisles) / k cannot beat
+    the incumbent, the remaining k are pruned, since that bound only decreases with k.
+    With reduce=True every process solves the reduced instance with merged orders.
+    An incumbent (selected_orders, visited_aisles) prunes and warm-starts from the first round.
+    Returns (selected_orders, visited_aisles, ratio) in the ids of the instance solved
+    (reduced or not), or None if no wave was found.
     """
+    workers = workers or os.cpu_count() or 1
+    deadline = Deadline(time_limit) if deadline is None else deadline
+    inst = load_instance(input_file)
+    multiplicity = None
+    if reduce:
+        reduction = reduce_instance(inst, merge_duplicates=True)
+        inst, multiplicity = reduction.instance, reduction.multiplicity
+    order_units = inst.order_units
+
+    stock = np.cumsum(np.sort(useful_stock(inst, multiplicity))[::-1])
+    total_units = order_units.sum() if multiplicity is None else (order_units * multiplicity).sum()
+    units_bound = np.minimum(np.minimum(stock, inst.wave_size_ub), float(total_units))
+    candidates = [k for k in range(1, len(stock) + 1) if stock[k - 1] >= inst.wave_size_lb]
 
-    with open(filename, "w") as file:
-        # Number of orders selected
-        file.write(f"{len(selected_orders)}\n")
+    best = None
+    if incumbent is not None:
+        best = (list(incumbent[0]), list(incumbent[1]), float(order_units[list(incumbent[0])].sum()) / len(incumbent[1]))
+        deadline.improved(best)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_k_worker, initargs=(input_file, reduce)) as executor:
+        while candidates and not deadline.expired():
+            ratio = 0.0 if best is None else best[2]
+            candidates = [k for k in candidates if units_bound[k - 1] / k > ratio * (1 + GAP_TOLERANCE)]
+            batch, candidates = candidates[:workers], candidates[workers:]
+            if not batch:
+                break
 
-        # List selected orders (could be indices or IDs, depending on your orders structure)
-        for order_idx in selected_orders:
-            file.write(f"{order_idx}\n")
+            start = None if best is None else (best[0], best[1])
+            remaining = deadline.remaining()
+            for k, solution in executor.map(_k_worker, batch, [remaining] * len(batch), [start] * len(batch)):
+                instrumentation.count("ip.solves")
+                if solution is None:
+                    continue
+                selected_orders, visited_aisles = solution
+                k_ratio = float(order_units[selected_orders].sum()) / len(visited_aisles)
+                print(f"k = {k}: {len(visited_aisles)} aisles, ratio = {k_ratio:.6f}")
+                if best is None or k_ratio > best[2]:
+                    best = (selected_orders, visited_aisles, k_ratio)
+                    deadline.improved(best)
+                    instrumentation.incumbent(k_ratio, "ip_k")
+
+    deadline.flush()
+    return best
+
+
+def load_incumbent(reduction, solution_file=None, grasp_seconds=None, seed=0):
+    """
+    Incumbent for the IP drivers in the ids of reduction.instance: a solution file in
+    original ids (text or binary, e.g. best_solution_grasp.txt), or the best wave of an
+    in-process GRASP run of grasp_seconds. GRASP runs on the original instance, since it
+    picks each order at most once and would miss the extra copies of merged orders.
+    Returns the (selected_orders, visited_aisles) pair, or None if there is none or it
+    is infeasible.
+    """
+    incumbent = None
+    if solution_file is not None:
+        selected_orders, visited_aisles = read_solution(solution_file)
+        inst = reduction.original
+        in_range = all(o < inst.n_orders for o in selected_orders) and all(a < inst.n_aisles for a in visited_aisles)
+        if not visited_aisles or not in_range or not WaveOrderPicking(inst).is_solution_feasible(selected_orders, visited_aisles):
+            print(f"Ignoring {solution_file}: not a feasible wave of this instance")
+            return None
+        incumbent = reduction.map_forward(selected_orders, visited_aisles)
+    elif grasp_seconds is not None:
+        solution = graspV2.grasp_aisle_based_batch(reduction.original, iterations=None, rng=random.Random(seed),
+                                                   deadline=Deadline(grasp_seconds))
+        if solution is not None:
+            incumbent = reduction.map_forward(sorted(solution[0]), sorted(solution[3]))
+    return incumbent
 
-        # Number of aisles visited
-        file.write(f"{len(visited_aisles)}\n")
 
-        # List each visited aisle
-        for aisle in visited_aisles:
-            file.write(f"{aisle}\n")
+if __name__ == "__main__":
+    # python integer-programaming.py [input_file] [--by-aisle-count [workers]]
+    #                                 [--start solution_file | --grasp seconds]
+    args = sys.argv[1:]
+    options = {}
+    for flag in ("--start", "--grasp"):
+        if flag in args:
+            i = args.index(flag)
+            options[flag] = args[i + 1]
+            del args[i:i + 2]
+    args = [a for a in args if a != "--by-aisle-count"]
+    input_file = args[0] if args else f"{explorer.path}/instance_0005.txt"
 
-write_solution_to_file(selected_orders, visited_aisles)
+    # Both drivers solve the reduced instance with merged orders; solutions are written in original ids
+    reduction = reduce_instance(load_instance(input_file), merge_duplicates=True)
+    incumbent = load_incumbent(reduction, options.get("--start"),
+                               float(options["--grasp"]) if "--grasp" in options else None)
+    checkpoint = lambda incumbent: write_solution(OUTPUT_FILE, *reduction.map_back(incumbent[0], incumbent[1]))
+    if "--by-aisle-count" in sys.argv:
+        workers = int(args[1]) if len(args) > 1 else None
+        best = aisle_count_enumeration(input_file, workers, deadline=Deadline(TIME_LIMIT, checkpoint), reduce=True,
+                                       incumbent=incumbent)
+    else:
+        best = dinkelbach(reduction.instance, deadline=Deadline(TIME_LIMIT, checkpoint), multiplicity=reduction.multiplicity,
+                          incumbent=incumbent)
 
+    if best is None:
+        print("No feasible wave found.")
+    else:
+        selected_orders, visited_aisles = reduction.map_back(best[0], best[1])
+        ratio = best[2]
+        print("Best ratio:", ratio)
+        print("Orders selected:", selected_orders)
+        print("Aisles visited:", visited_aisles)
+        write_solution(OUTPUT_FILE, selected_orders, visited_aisles)
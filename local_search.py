@@ -0,0 +1,264 @@
+import random
+import numpy as np
+import instrumentation
+from instance import csr_positions
+from bitset import aisle_bitsets, from_bool, to_ids
+from evaluator import IncrementalEvaluator, ADD_ORDER, DROP_ORDER, ADD_AISLE, DROP_AISLE
+
+# Size of the candidate lists scanned by every neighborhood
+ORDER_CANDIDATES = 20
+AISLE_CANDIDATES = 8
+
+# Orders dropped by a perturbation kick, and kicks in a row without improvement before stopping
+KICK_ORDERS = 3
+MAX_KICKS = 10
+
+
+def aisle_gains(inst, stock, batch_mask, room, aisle_mask):
+    # Units of the unselected orders (within the room) that a single new aisle would make fit;
+    # aisle_mask flags the aisles already in the wave
+    fits_room = ~batch_mask & (inst.order_units <= room)
+    entries = fits_room[inst.order_rows]
+    short = entries & (stock[inst.order_items] < inst.order_qty)
+    orders, items = inst.order_rows[short], inst.order_items[short]
+    extra = inst.order_qty[short] - stock[items]
+    short_count = np.bincount(orders, minlength=inst.n_orders)
+
+    # (order, aisle) pairs where the aisle alone covers one short item of the order
+    indptr, aisles, aisle_qty = inst.item_aisles()
+    positions = csr_positions(indptr, items)
+    counts = indptr[items + 1] - indptr[items]
+    pair_orders, pair_extra = np.repeat(orders, counts), np.repeat(extra, counts)
+    pair_aisles = aisles[positions]
+    keep = aisle_qty[positions] >= pair_extra
+    keep &= ~aisle_mask[pair_aisles]
+
+    pairs, covered = np.unique(pair_orders[keep].astype(np.int64) * inst.n_aisles + pair_aisles[keep], return_counts=True)
+    pair_orders, pair_aisles = pairs // inst.n_aisles, pairs % inst.n_aisles
+    opened = covered == short_count[pair_orders]
+    return np.bincount(pair_aisles[opened], weights=inst.order_units[pair_orders[opened]], minlength=inst.n_aisles)
+
+
+def fill_orders(state, candidates=None):
+    # Greedily adds every unselected order (among the candidates, if given) that fits the
+    # remaining stock and the wave upper bound
+    inst = state.inst
+    if candidates is None:
+        fits = inst.orders_fitting(state.stock - state.demand) & ~state.order_selected
+        candidates = np.nonzero(fits)[0]
+    else:
+        candidates = candidates[~state.order_selected[candidates]]
+        candidates = candidates[inst.orders_fitting(state.stock - state.demand, candidates)]
+
+    for order_idx in candidates.tolist():
+        if state.units + inst.order_units[order_idx] <= inst.wave_size_ub and state.fits(order_idx):
+            state.apply(ADD_ORDER, order_idx)
+
+
+def repair_orders(state, dropped_aisle):
+    # Drops the smallest selected orders holding items left short by the dropped aisle, then
+    # refills with the orders sharing items with the dropped ones
+    inst = state.inst
+    aisle_items, _ = inst.aisle(dropped_aisle)
+    short_items = aisle_items[state.demand[aisle_items] > state.stock[aisle_items]]
+    if len(short_items) == 0:
+        return
+
+    touching = inst.orders_with_items(short_items)
+    touching = touching[state.order_selected[touching]]
+
+    dropped = []
+    for order_idx in touching[np.argsort(inst.order_units[touching], kind="stable")].tolist():
+        if state.num_short == 0:
+            break
+        items, qty = inst.order(order_idx)
+        if np.any(state.demand[items] > state.stock[items]):
+            state.apply(DROP_ORDER, order_idx)
+            dropped.append(order_idx)
+
+    freed_items = inst.order_items[csr_positions(inst.order_indptr, np.array(dropped, dtype=np.int64))]
+    fill_orders(state, inst.orders_with_items(freed_items))
+
+
+class LocalSearch:
+    """
+    Iterated local search over an IncrementalEvaluator state. Every descent step scans
+    these neighborhoods and applies the best improving move (best improvement):
+    - swap(order_in, order_out): unselected orders fully stocked by the visited aisles,
+      largest first, against the selected orders freeing the stock or room they need;
+    - add aisle, then refill: the aisles opening the most units of unselected orders;
+    - drop aisle, then repair: the visited aisles supplying the fewest demanded units;
+    - swap(aisle_in, aisle_out): every aisle of the drop list, repaired, against the
+      aisles opening the most units once it is gone, refilled.
+    Compound moves are applied, scored and undone on the state, so nothing is rebuilt.
+    At a local optimum a kick drops a few random orders and swaps a random visited aisle
+    for another aisle stocking one of its items; the new local optimum is kept when it
+    is no worse than the best one and undone otherwise.
+    """
+
+    def __init__(self, inst, rng=None, deadline=None):
+        self.inst = inst
+        self.rng = random if rng is None else rng
+        self.deadline = deadline
+
+    def expired(self):
+        return self.deadline is not None and self.deadline.expired()
+
+    def order_swaps(self, state):
+        # Best swap(order_in, order_out) or add(order_in), as (objective, moves)
+        inst = self.inst
+        units = inst.order_units
+        candidates = np.nonzero(inst.orders_fitting(state.stock) & ~state.order_selected)[0]
+        candidates = candidates[np.argsort(-units[candidates], kind="stable")[:ORDER_CANDIDATES]]
+        selected = np.nonzero(state.order_selected)[0]
+        slack = state.stock - state.demand
+
+        best_gain, best_path = 0, None
+        for order_in in candidates.tolist():
+            u_in = int(units[order_in])
+            if u_in <= best_gain:
+                break
+            items, qty = inst.order(order_in)
+            short = items[slack[items] < qty]
+            if len(short) == 0 and state.units + u_in <= inst.wave_size_ub:
+                best_gain, best_path = u_in, [(ADD_ORDER, order_in)]
+                continue
+
+            # Orders to swap out must hold a short item (if any) and free enough room
+            outs = selected if len(short) == 0 else np.intersect1d(selected, inst.orders_with_items(short[:1]))
+            outs = outs[(units[outs] < u_in - best_gain) & (units[outs] >= state.units + u_in - inst.wave_size_ub)
+                        & (state.units - units[outs] + u_in >= inst.wave_size_lb)]
+            for order_out in outs[np.argsort(units[outs], kind="stable")[:ORDER_CANDIDATES]].tolist():
+                state.apply(DROP_ORDER, order_out)
+                _, _, feasible = state.peek(ADD_ORDER, order_in)
+                state.undo()
+                instrumentation.count("local_search.moves")
+                if feasible:
+                    best_gain, best_path = u_in - int(units[order_out]), [(DROP_ORDER, order_out), (ADD_ORDER, order_in)]
+                    break
+
+        if best_path is None:
+            return None, None
+        return (state.units + best_gain) / state.num_aisles, best_path
+
+    def aisles_in(self, state):
+        room = self.inst.wave_size_ub - state.units
+        gains = aisle_gains(self.inst, state.stock - state.demand, state.order_selected, room, state.aisle_selected)
+        ranked = np.argsort(-gains, kind="stable")[:AISLE_CANDIDATES]
+        return ranked[gains[ranked] > 0].tolist()
+
+    def aisles_out(self, state):
+        # Visited aisles by increasing demanded units they stock
+        visited = np.nonzero(state.aisle_selected)[0].tolist()
+        useful = []
+        for aisle in visited:
+            items, qty = self.inst.aisle(aisle)
+            useful.append(int(np.minimum(qty, state.demand[items]).sum()))
+        return [visited[i] for i in np.argsort(useful, kind="stable")[:AISLE_CANDIDATES]]
+
+    def add_aisle(self, aisle):
+        def apply(state):
+            state.apply(ADD_AISLE, aisle)
+            fill_orders(state, self.inst.orders_with_items(self.inst.aisle(aisle)[0]))
+        return apply
+
+    def drop_aisle(self, aisle):
+        def apply(state):
+            state.apply(DROP_AISLE, aisle)
+            repair_orders(state, aisle)
+        return apply
+
+    def step(self, state):
+        # Applies the best improving move of all neighborhoods; False at a local optimum
+        base = state.mark()
+        state_value = state.objective()
+        best_value, best_path = self.order_swaps(state)
+
+        def consider():
+            nonlocal best_value, best_path
+            instrumentation.count("local_search.moves")
+            if state.is_feasible() and state.objective() > (state_value if best_value is None else best_value):
+                best_value, best_path = state.objective(), state.history[base:]
+
+        for aisle in self.aisles_in(state):
+            self.add_aisle(aisle)(state)
+            consider()
+            state.undo_to(base)
+
+        # Every dropped aisle is scored alone, then swapped for the aisles opening the most units without it
+        for aisle_out in self.aisles_out(state):
+            if self.expired():
+                break
+            self.drop_aisle(aisle_out)(state)
+            consider()
+            dropped = state.mark()
+            for aisle_in in self.aisles_in(state):
+                if aisle_in != aisle_out:
+                    self.add_aisle(aisle_in)(state)
+                    consider()
+                    state.undo_to(dropped)
+            state.undo_to(base)
+
+        if best_path is None:
+            return False
+        for move, idx in best_path:
+            state.apply(move, idx)
+        if best_path[0][0] == DROP_ORDER:
+            fill_orders(state, self.inst.orders_with_items(self.inst.order(best_path[0][1])[0]))
+        return True
+
+    def descend(self, state):
+        while not self.expired() and self.step(state):
+            instrumentation.count("local_search.improvements")
+
+    def kick(self, state):
+        inst = self.inst
+        selected = sorted(state.selected_orders())
+        dropped = self.rng.sample(selected, max(0, min(KICK_ORDERS, len(selected) - 1)))
+        for order_idx in dropped:
+            state.apply(DROP_ORDER, order_idx)
+
+        # An empty wave (possible with wave_size_lb == 0) has no aisle to swap and is only refilled
+        visited = from_bool(state.aisle_selected)
+        if visited:
+            aisle_out = self.rng.choice(to_ids(visited))
+            neighbors = to_ids(aisle_bitsets(inst).aisles_with(inst.aisle(aisle_out)[0]) & ~visited)
+            if neighbors:
+                self.drop_aisle(aisle_out)(state)
+                self.add_aisle(self.rng.choice(neighbors))(state)
+        fill_orders(state, np.setdiff1d(np.arange(inst.n_orders), dropped))
+
+    def run(self, state, max_kicks=MAX_KICKS):
+        """
+        Descends from a feasible state, then kicks and descends again until max_kicks
+        kicks in a row bring no improvement. Leaves the state at the best local optimum.
+        """
+        self.descend(state)
+        best = state.objective()
+        state.history.clear()
+
+        stalled = 0
+        while stalled < max_kicks and not self.expired():
+            self.kick(state)
+            instrumentation.count("local_search.kicks")
+            if state.is_feasible():
+                self.descend(state)
+            if state.is_feasible() and state.objective() >= best:
+                stalled = 0 if state.objective() > best else stalled + 1
+                best = state.objective()
+                state.history.clear()
+            else:
+                state.undo_to(0)
+                stalled += 1
+        return best
+
+
+def iterated_local_search(inst, orders, aisles, rng=None, deadline=None, max_kicks=MAX_KICKS):
+    """
+    Runs LocalSearch from a feasible wave; returns (selected_orders, aisle mask, objective)
+    of the best wave found, the aisle mask holding every visited aisle.
+    """
+    state = IncrementalEvaluator(inst, orders, aisles)
+    fill_orders(state)
+    objective = LocalSearch(inst, rng, deadline).run(state, max_kicks)
+    return state.selected_orders(), state.aisle_selected.copy(), objective
@@ -1,19 +1,9 @@
-import random
+import sys
 import numpy as np
 import explorer
-
-# ----------------------
-# Problem Data
-# ----------------------
-
-orders, warehouse, lb, ub = explorer.parse()
-
-items = list(warehouse.keys())
-NUM_ITEMS = len(items)
-NUM_ORDERS = len(orders)
-
-MAX_CAPACITY = ub   
-MIN_CAPACITY = lb   
+from budget import Deadline
+import instrumentation
+from solution_io import write_solution
 
 # ----------------------
 # PSO Parameters
@@ -21,122 +11,165 @@ MIN_CAPACITY = lb
 
 NUM_PARTICLES = 500
 MAX_ITERATIONS = 200
-C1 = 2    
-C2 = 2    
-W = 1   
-
-
-def calculate_fitness(particle):
-    corridors_visited = set()
-    total_quantity = 0
-
-    #print(particle)
-    for order_idx, selected in enumerate(particle):
-        if selected == 1:  # Order selected
-            order = orders[order_idx]
-            for item, qty in order.items():
-                if item in warehouse:
-                    for aisle, aisle_qty in warehouse[item].items():
-                        #print("aisle: ", aisle)
-                        #print("quantity: ", aisle_qty)
-                        if qty <= aisle_qty: 
-                            corridors_visited.add(aisle)
-                            total_quantity += qty
-                            break
-                        else:
-                            qty =- aisle_qty
-                            continue
-
-    num_corridors = len(corridors_visited)
-
-    if total_quantity > MAX_CAPACITY or total_quantity < MIN_CAPACITY:
-        return 1e6  
-
-    if num_corridors == 0 or total_quantity == 0:
-        efficiency = 0
-    else:
-        efficiency = total_quantity / num_corridors
-
-    penalty = 0
-    if total_quantity > MAX_CAPACITY:
-        penalty += (total_quantity - MAX_CAPACITY) * 10
-        efficiency = 0
-    elif total_quantity < MIN_CAPACITY:
-        penalty += (MIN_CAPACITY - total_quantity) * 10
-        efficiency = 0
+TIME_LIMIT = None  # seconds, None runs every iteration
+C1 = 2
+C2 = 2
+W = 1
+V_MAX = 6  # velocity clamp, keeps sigmoid(v) away from 0/1 so particles can still flip
+PENALTY = 10  # per unit outside the wave bounds or missing from the warehouse
+OUTPUT_FILE = "best_solution_pso.txt"
 
-    fitness = -efficiency + penalty
-    return fitness
 
 def sigmoid(x):
     return 1 / (1 + np.exp(-x))
 
 
-# PSO Core 
-
-particles = [np.random.randint(2, size=NUM_ORDERS) for _ in range(0,NUM_PARTICLES)]
-velocities = [np.random.uniform(-1, 1, NUM_ORDERS) for _ in range(NUM_PARTICLES)]
-
-pbest_positions = [particle.copy() for particle in particles]
-pbest_scores = [calculate_fitness(p) for p in particles]
-
-gbest_index = np.argmin(pbest_scores)
-gbest_position = pbest_positions[gbest_index].copy()
-gbest_score = pbest_scores[gbest_index]
-
-for iteration in range(MAX_ITERATIONS):
-    for i in range(NUM_PARTICLES):
-        r1, r2 = random.random(), random.random()
-        velocities[i] = (
-            W * velocities[i]
-            + C1 * r1 * (pbest_positions[i] - particles[i])
-            + C2 * r2 * (gbest_position - particles[i])
+class CoverEvaluator:
+    """
+    Vectorized fitness of a (particles x orders) selection matrix. The demand of every
+    item is covered from its aisles in decreasing stock order until the cumulative stock
+    reaches it, so a wave visits the union of the aisles each of its items needs.
+    Fitness is units / visited aisles for feasible waves, and minus PENALTY times the
+    units outside the wave bounds plus the units the warehouse cannot supply otherwise.
+    """
+
+    def __init__(self, inst):
+        self.inst = inst
+        self.order_units = inst.order_units.astype(np.int64)
+
+        order_indptr, self.item_orders, self.item_order_qty = inst.item_orders()
+        self.demanded_items = np.nonzero(np.diff(order_indptr))[0]
+        self.demand_starts = order_indptr[self.demanded_items]
+
+        # Within-row cumulative stock, shifted by row * offset so one searchsorted covers every item
+        self.aisle_indptr, self.item_aisles, qty = inst.item_aisles_by_stock()
+        cumulative = np.cumsum(qty.astype(np.int64))
+        row_starts = np.concatenate(([0], cumulative))[self.aisle_indptr[:-1]]
+        rows = np.repeat(np.arange(inst.n_items), np.diff(self.aisle_indptr))
+        self.offset = int(cumulative[-1]) + 1 if len(cumulative) else 1
+        self.shifted_stock = cumulative - row_starts[rows] + rows * self.offset
+        self.item_stock = inst.item_stock.astype(np.int64)
+
+    def demand(self, orders):
+        demand = np.zeros((orders.shape[0], self.inst.n_items), dtype=np.int64)
+        if len(self.demanded_items):
+            contributions = orders[:, self.item_orders] * self.item_order_qty
+            demand[:, self.demanded_items] = np.add.reduceat(contributions, self.demand_starts, axis=1)
+        return demand
+
+    def cover(self, demand):
+        # (particles x aisles) mask of the aisles each wave visits and the units it cannot supply
+        short = np.maximum(demand - self.item_stock, 0).sum(axis=1)
+
+        rows, items = np.nonzero(demand > 0)
+        keep = demand[rows, items] <= self.item_stock[items]
+        rows, items = rows[keep], items[keep]
+
+        # Position of the last aisle needed: first one whose cumulative stock reaches the demand
+        last = np.searchsorted(self.shifted_stock, demand[rows, items] + items * self.offset)
+        counts = last - self.aisle_indptr[items] + 1
+        positions = np.repeat(self.aisle_indptr[items] - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+
+        visited = np.zeros((demand.shape[0], self.inst.n_aisles), dtype=bool)
+        visited[np.repeat(rows, counts), self.item_aisles[positions]] = True
+        return visited, short
+
+    def evaluate(self, orders):
+        units = orders.astype(np.int64) @ self.order_units
+        visited, short = self.cover(self.demand(orders))
+        num_visited = visited.sum(axis=1)
+
+        violation = np.maximum(self.inst.wave_size_lb - units, 0) + np.maximum(units - self.inst.wave_size_ub, 0) + short
+        feasible = (violation == 0) & (num_visited > 0)
+        return np.where(feasible, units / np.maximum(num_visited, 1), -PENALTY * violation.astype(float))
+
+    def wave(self, selection):
+        # (selected order ids, visited aisle ids) of a single selection vector
+        visited, _ = self.cover(self.demand(selection[None, :]))
+        return np.nonzero(selection)[0].tolist(), np.nonzero(visited[0])[0].tolist()
+
+
+def binary_pso(inst, num_particles=NUM_PARTICLES, max_iterations=MAX_ITERATIONS, deadline=None, seed=None, verbose=False):
+    """
+    Binary PSO over order selections: velocities and positions are (particles x orders)
+    arrays updated for the whole swarm at once, and position bits are resampled with
+    probability sigmoid(velocity). Velocities start around the logit of the selection
+    density that puts a particle's units inside the wave bounds.
+    verbose=True prints the best fitness after every iteration.
+    Returns (selected_orders, visited_aisles, ratio); ratio <= 0 means no feasible wave.
+    """
+    deadline = Deadline() if deadline is None else deadline
+    rng = np.random.default_rng(seed)
+    evaluator = CoverEvaluator(inst)
+
+    total_units = max(int(evaluator.order_units.sum()), 1)
+    target = rng.uniform(inst.wave_size_lb, inst.wave_size_ub + 1, size=(num_particles, 1))
+    density = np.clip(target / total_units, 1e-6, 1 - 1e-6)
+
+    shape = (num_particles, inst.n_orders)
+    velocities = np.clip(np.log(density / (1 - density)) + rng.uniform(-1, 1, shape), -V_MAX, V_MAX)
+    particles = rng.random(shape) < sigmoid(velocities)
+
+    pbest_positions = particles.copy()
+    with instrumentation.timer("pso.evaluate"):
+        pbest_scores = evaluator.evaluate(particles)
+
+    g = int(np.argmax(pbest_scores))
+    gbest_position = pbest_positions[g].copy()
+    gbest_score = float(pbest_scores[g])
+    if gbest_score > 0:
+        deadline.improved(evaluator.wave(gbest_position))
+        instrumentation.incumbent(gbest_score, "pso")
+
+    for iteration in range(max_iterations):
+        if deadline.expired():
+            break
+
+        r1 = rng.random((num_particles, 1))
+        r2 = rng.random((num_particles, 1))
+        positions = particles.astype(np.int8)
+        velocities = (
+            W * velocities
+            + C1 * r1 * (pbest_positions.astype(np.int8) - positions)
+            + C2 * r2 * (gbest_position.astype(np.int8) - positions)
         )
+        np.clip(velocities, -V_MAX, V_MAX, out=velocities)
+        particles = rng.random(shape) < sigmoid(velocities)
 
-        prob = sigmoid(velocities[i])
-        particles[i] = np.array([1 if random.random() < prob[j] else 0 for j in range(NUM_ORDERS)])
+        with instrumentation.timer("pso.evaluate"):
+            fitness = evaluator.evaluate(particles)
+        instrumentation.count("pso.evaluations", num_particles)
 
-        fitness = calculate_fitness(particles[i])
+        better = fitness > pbest_scores
+        pbest_scores[better] = fitness[better]
+        pbest_positions[better] = particles[better]
 
-        if fitness < pbest_scores[i]:
-            pbest_scores[i] = fitness
-            pbest_positions[i] = particles[i].copy()
+        g = int(np.argmax(fitness))
+        if fitness[g] > gbest_score:
+            gbest_score = float(fitness[g])
+            gbest_position = particles[g].copy()
+            if gbest_score > 0:
+                deadline.improved(evaluator.wave(gbest_position))
+                instrumentation.incumbent(gbest_score, "pso")
 
-        if fitness < gbest_score:
-            gbest_score = fitness
-            gbest_position = particles[i].copy()
+        if verbose:
+            print(f"Iteration {iteration + 1}/{max_iterations}: Best Fitness = {gbest_score:.4f}")
 
-    print(f"Iteration {iteration + 1}/{MAX_ITERATIONS}: Best Fitness = {gbest_score:.4f}")
-    print("BEST POSITION FOUND:", gbest_position)
+    deadline.flush()
+    selected_orders, visited_aisles = evaluator.wave(gbest_position)
+    return selected_orders, visited_aisles, gbest_score
 
 
+if __name__ == "__main__":
+    # python pso.py [input_file]
+    inst = explorer.load(sys.argv[1] if len(sys.argv) > 1 else None)
 
-selected_orders = [i for i in range(NUM_ORDERS) if gbest_position[i] == 1]
-total_quantity = sum([sum(order.values()) for i, order in enumerate(orders) if gbest_position[i] == 1])
+    checkpoint = lambda wave: write_solution(OUTPUT_FILE, wave[0], wave[1])
+    selected_orders, visited_aisles, ratio = binary_pso(inst, deadline=Deadline(TIME_LIMIT, checkpoint), verbose=True)
 
-corridors_visites = set()
-for order_idx, selected in enumerate(gbest_position):
-    if selected == 1:  # Order selected
-        order = orders[order_idx]
-        for item, qty in order.items():
-            if item in warehouse:
-                for aisle, aisle_qty in warehouse[item].items():
-                    #print("aisle: ", aisle)
-                    #print("quantity: ", aisle_qty)
-                    if qty <= aisle_qty:
-                        corridors_visites.add(aisle)
-                        total_quantity += qty
-                        break
-                    else:
-                        qty =- aisle_qty
-                        continue
-
-num_corridors = len(corridors_visites)
-
-efficiency = total_quantity / num_corridors if num_corridors != 0 else 0
-
-#print(f"Selected Orders (indexes): {selected_orders}")
-#print(f"Total Quantity Picked: {total_quantity}")
-#print(f"Corridors Visited (indexes): {sorted(corridors_visites)}")
-#print(f"Number of Corridors Visited: {num_corridors}")
-#print(f"Efficiency (items per corridor): {efficiency:.4f}")
+    if ratio <= 0:
+        print("No feasible wave found.")
+    else:
+        print(f"Best ratio: {ratio:.4f}")
+        print(f"Orders selected: {len(selected_orders)}, aisles visited: {len(visited_aisles)}")
+        write_solution(OUTPUT_FILE, selected_orders, visited_aisles)
@@ -1,233 +1,271 @@
-import random
+import sys
 import numpy as np
 import explorer
-from collections import defaultdict
-
-# Data
-orders, warehouse, lb, ub = explorer.parse()
-
-items = np.array(list(warehouse.keys()))
-NUM_ITEMS = len(items)
-NUM_ORDERS = len(orders)
-
-MAX_CAPACITY = ub  
-MIN_CAPACITY = lb  
+from budget import Deadline
+from fitness_cache import LRUCache, ZobristHasher
+import instrumentation
+from bounds import capacity_bound, format_gap, reached
+from instance import csr_positions
+from reduction import reduce_instance
+from solution_io import write_solution
 
 num_particles = 200
 num_iterations = 40
 mutation_rate = 0.6
-
-fitness_cache = {}  
-tabu_list = set()  
-
-
-def get_particle_hash(order_selection, aisle_assignment):
-    orders_hash = tuple(order_selection.tolist())
-    aisles_hash = tuple(sorted(aisle_assignment.items()))
-    return hash((orders_hash, aisles_hash))
-
-
-def calculate_fitness(order_selection, aisle_assignment):
-    total_items = 0
-    visited_aisles = set()
-
-    batch_items = defaultdict(int)
-    for order_idx in order_selection:
-        for item, qty in orders[order_idx].items():
-            batch_items[item] += qty
-
-    for item, qty in batch_items.items():
-        if item not in aisle_assignment:
-            return 0 
-
-        aisle = aisle_assignment[item]
-        available_qty = warehouse.get(item, {}).get(aisle, 0)
-
-        if available_qty < qty:
-            return 0 
-
-        visited_aisles.add(aisle)
-        total_items += qty
-
-    if len(visited_aisles) == 0:
-        return 0
-
-    efficiency = total_items / len(visited_aisles)
-
-    return efficiency
-
-
-def calculate_fitness_with_cache(order_selection, aisle_assignment):
-    state_hash = get_particle_hash(order_selection, aisle_assignment)
-
-    if state_hash in fitness_cache:
-        return fitness_cache[state_hash]
-
-    fitness = calculate_fitness(order_selection, aisle_assignment)
-    fitness_cache[state_hash] = fitness
-
-    return fitness
-
-
-def initialize_particle():
-    valid = False
-    while not valid:
-        # Generate a binary mask and use it to select order indices
-        mask = np.random.rand(NUM_ORDERS) < 0.5
-        order_selection = np.nonzero(mask)[0]
-
-        total_items = sum(
-            sum(orders[idx].values()) for idx in order_selection
-        )
-
-        if MIN_CAPACITY <= total_items <= MAX_CAPACITY:
-            valid = True
-
-    aisle_assignment = {}
-    for order_idx in order_selection:
-        for item in orders[order_idx]:
-            if item not in aisle_assignment:
-                aisles = np.array(list(warehouse.get(item, {}).keys()))
-                if len(aisles) > 0:
-                    aisle_assignment[item] = np.random.choice(aisles)
-
-    return order_selection, aisle_assignment
-
-
-def mutate_aisle_assignment(aisle_assignment, mutation_rate=0.1):
-    new_assignment = aisle_assignment.copy()
-    already_selected_aisles = set(new_assignment.values())
-
-    for item in aisle_assignment.keys():
-        if np.random.rand() < mutation_rate:
-            possible_aisles = np.array(list(warehouse.get(item, {}).keys()))
-
-            # Prefer aisles already being visited
-            preferred_aisles = possible_aisles[np.isin(possible_aisles, list(already_selected_aisles))]
-
-            if len(preferred_aisles) > 0:
-                new_assignment[item] = np.random.choice(preferred_aisles)
-            elif len(possible_aisles) > 0:
-                new_assignment[item] = np.random.choice(possible_aisles)
-
-    return new_assignment
-
-
-def mutate_order_selection(order_selection, mutation_rate=0.1):
-    current_selection = order_selection.copy()
-    new_selection = current_selection.tolist()
-
-    for idx in range(NUM_ORDERS):
-        if np.random.rand() < mutation_rate:
-            if idx in new_selection:
-                new_selection.remove(idx)
-            else:
-                new_selection.append(idx)
-
-    new_selection = np.array(sorted(set(new_selection)))
-
-    total_items = sum(
-        sum(orders[idx].values()) for idx in new_selection
-    )
-
-    if total_items < MIN_CAPACITY or total_items > MAX_CAPACITY:
-        return current_selection
-
-    return new_selection
-
-
-def pso():
-    swarm = []
-    global_best_position = None
-    global_best_fitness = float('-inf')
-
-    for _ in range(num_particles):
-        order_selection, aisle_assignment = initialize_particle()
-
-        particle_hash = get_particle_hash(order_selection, aisle_assignment)
-
-        if particle_hash in tabu_list:
-            continue
-
-        tabu_list.add(particle_hash)
-        fitness = calculate_fitness_with_cache(order_selection, aisle_assignment)
-
-        swarm.append({
-            'order_selection': order_selection,
-            'aisle_assignment': aisle_assignment,
-            'fitness': fitness,
-            'best_order_selection': order_selection,
-            'best_aisle_assignment': aisle_assignment,
-            'best_fitness': fitness
-        })
-
-        if fitness > global_best_fitness:
-            global_best_fitness = fitness
-            global_best_position = (order_selection, aisle_assignment)
-            #salvar na classe solution
-
-    for iteration in range(num_iterations):
-        print(f"Iteration {iteration + 1}/{num_iterations}")
-
-        for particle in swarm:
-            order_selection = particle['order_selection']
-            aisle_assignment = particle['aisle_assignment']
-
-            new_order_selection = mutate_order_selection(order_selection, mutation_rate)
-            new_aisle_assignment = mutate_aisle_assignment(aisle_assignment, mutation_rate)
-
-            particle_hash = get_particle_hash(new_order_selection, new_aisle_assignment)
-
-            if particle_hash in tabu_list:
+TIME_LIMIT = None  # seconds, None runs every iteration
+
+# Candidate aisles drawn per mutated item when looking for one the particle already visits
+AISLE_TRIES = 4
+
+# Bounds of the tabu store (particle states) and of the per-run demand cache (order selections)
+TABU_SIZE = 100_000
+CACHE_SIZE = 200_000
+
+OUTPUT_FILE = "best_solution.txt"
+
+
+def nonzero_2d(mask):
+    # (rows, cols) of a 2-d mask like np.nonzero, through the flat indices, which is
+    # several times faster on swarm-sized matrices
+    return np.divmod(np.flatnonzero(mask), mask.shape[1])
+
+
+class SwarmEngine:
+    """
+    Whole-swarm representation of the PSO particles:
+    - orders: (particles x orders) boolean selection matrix
+    - choice: (particles x items) position of the chosen aisle in the item's row of the
+      item x aisle CSR, so every item is picked from a single aisle
+    Fitness, mutation and initialization work on all particles at once.
+    """
+
+    def __init__(self, inst, rng):
+        self.inst = inst
+        self.rng = rng
+
+        self.aisle_indptr, self.item_aisles, self.item_aisle_qty = inst.item_aisles()
+        self.num_choices = np.diff(self.aisle_indptr)
+        self.has_aisle = self.num_choices > 0
+
+        self.order_units = inst.order_units.astype(np.int64)
+
+        rows = np.repeat(np.arange(inst.n_items), self.num_choices)
+        by_stock = np.lexsort((-self.item_aisle_qty, rows))
+        self.max_stock_choice = np.zeros(inst.n_items, dtype=np.int32)
+        self.max_stock_choice[self.has_aisle] = by_stock[self.aisle_indptr[:-1][self.has_aisle]] - self.aisle_indptr[:-1][self.has_aisle]
+
+    def initialize(self, num_particles):
+        # Every particle aims at a random unit total inside the wave bounds
+        total_units = max(int(self.order_units.sum()), 1)
+        target = self.rng.uniform(self.inst.wave_size_lb, self.inst.wave_size_ub + 1, size=(num_particles, 1))
+        orders = self.rng.random((num_particles, self.inst.n_orders)) < target / total_units
+
+        # Every item starts at its best-stocked aisle; mutation spreads the choices from there
+        return orders, np.tile(self.max_stock_choice, (num_particles, 1))
+
+    def units(self, orders):
+        return orders.astype(np.int64) @ self.order_units
+
+    def demand(self, orders):
+        # Sparse product of the selection with the order x item CSR: only the nonzeros of
+        # the selected orders are gathered, summed per (particle, item) with one bincount
+        inst = self.inst
+        rows, selected = nonzero_2d(orders)
+        positions = csr_positions(inst.order_indptr, selected)
+        keys = np.repeat(rows, np.diff(inst.order_indptr)[selected]) * inst.n_items + inst.order_items[positions]
+        demand = np.bincount(keys, weights=inst.order_qty[positions], minlength=orders.shape[0] * inst.n_items)
+        return demand.astype(np.int64).reshape(orders.shape[0], inst.n_items)
+
+    def chosen(self, choice):
+        # CSR positions of the chosen (item, aisle) pairs, clipped for items without aisles
+        positions = self.aisle_indptr[:-1] + choice
+        return np.minimum(positions, max(len(self.item_aisles) - 1, 0))
+
+    def evaluate(self, orders, choice, demand=None):
+        """
+        Returns (fitness, visited, needed) for the whole swarm: fitness is units / visited
+        aisles for feasible particles and 0 otherwise, visited is the (particles x aisles)
+        mask of the aisles each particle picks from and needed the (particles x items) mask
+        of the items its orders require. `demand` is the demand of the orders if known.
+        """
+        units = self.units(orders)
+        demand = self.demand(orders) if demand is None else demand
+        needed = demand > 0
+
+        positions = self.chosen(choice)
+        stock = np.where(self.has_aisle, self.item_aisle_qty[positions], 0)
+        covered = np.all(~needed | (demand <= stock), axis=1)
+
+        visited = self.visits(needed, choice)
+        num_visited = visited.sum(axis=1)
+
+        in_bounds = (units >= self.inst.wave_size_lb) & (units <= self.inst.wave_size_ub)
+        feasible = covered & in_bounds & (num_visited > 0)
+        fitness = np.where(feasible, units / np.maximum(num_visited, 1), 0.0)
+        return fitness, visited, needed
+
+    def visits(self, needed, choice):
+        # (particles x aisles) mask of the aisles the particles pick their needed items from
+        positions = self.chosen(choice)
+        visited = np.zeros((needed.shape[0], self.inst.n_aisles), dtype=bool)
+        rows, cols = nonzero_2d(needed & self.has_aisle)
+        visited[rows, self.item_aisles[positions[rows, cols]]] = True
+        return visited
+
+    def mutate_orders(self, orders, rate):
+        # Flip every order bit with probability `rate`; particles leaving the wave bounds keep their selection
+        new_orders = orders ^ (self.rng.random(orders.shape) < rate)
+        units = self.units(new_orders)
+        out_of_bounds = (units < self.inst.wave_size_lb) | (units > self.inst.wave_size_ub)
+        new_orders[out_of_bounds] = orders[out_of_bounds]
+        return new_orders
+
+    def mutate_aisles(self, choice, visited, needed, rate):
+        """
+        Re-draws the aisle of every needed item with probability `rate`, preferring aisles already
+        visited; the choice of items outside the particle's wave does not affect its fitness.
+        Returns (new_choice, rows, items) with the (particle, item) entries that changed.
+        """
+        new_choice = choice.copy()
+        rows, items = nonzero_2d(needed & (self.num_choices > 1))
+        keep = self.rng.random(len(rows)) < rate
+        rows, items = rows[keep], items[keep]
+        if len(rows) == 0:
+            return new_choice, rows, items
+
+        candidates = (self.rng.random((len(rows), AISLE_TRIES)) * self.num_choices[items, None]).astype(np.int32)
+        candidate_aisles = self.item_aisles[self.aisle_indptr[items, None] + candidates]
+        preferred = visited.ravel()[rows[:, None] * visited.shape[1] + candidate_aisles]
+        pick = preferred.argmax(axis=1)  # the first visited candidate, or the first one if none is
+        new_choice[rows, items] = candidates[np.arange(len(rows)), pick]
+
+        changed = new_choice[rows, items] != choice[rows, items]
+        return new_choice, rows[changed], items[changed]
+
+    def position(self, orders, choice):
+        # (selected order ids, {item: aisle}) of a single particle, the shape written to disk
+        order_selection = np.nonzero(orders)[0]
+        items = np.nonzero(self.demand(orders[None, :])[0] > 0)[0]
+        items = items[self.has_aisle[items]]
+        aisles = self.item_aisles[self.chosen(choice)[items]]
+        return order_selection, dict(zip(items.tolist(), aisles.tolist()))
+
+
+def cached_demand(engine, cache, orders, order_hashes):
+    # Demand of the selections, looked up by order-selection hash: particles that only changed
+    # aisle choices, or returned to a selection seen before, skip the order x item product
+    demand = np.zeros((len(orders), engine.inst.n_items), dtype=np.int64)
+    missing = []
+    for p, order_hash in enumerate(order_hashes.tolist()):
+        entry = cache.get(order_hash)
+        if entry is None:
+            missing.append(p)
+        else:
+            demand[p, entry[0]] = entry[1]
+    instrumentation.count("psoV3.cache_hits", len(orders) - len(missing))
+    instrumentation.count("psoV3.cache_misses", len(missing))
+
+    if missing:
+        demand[missing] = engine.demand(orders[missing])
+        for p in missing:
+            items = np.nonzero(demand[p])[0]
+            cache.put(int(order_hashes[p]), (items, demand[p, items]))
+    return demand
+
+
+def pso(inst, deadline=None, seed=None, cache=None, hash_seed=0, upper_bound=None, verbose=False, iterations=None):
+    """
+    Runs the swarm for `iterations` iterations (num_iterations by default) and returns
+    (global_best_position, global_best_fitness).
+    Particle states are identified by incremental Zobrist hashes: the bounded tabu store
+    keeps particles from revisiting recent states, and `cache` maps the hashes of order
+    selections alone to their sparse demand, which the many moves changing only aisle
+    choices reuse (an LRUCache of CACHE_SIZE selections by default; any object with
+    get/put works).
+    The swarm stops early once the best fitness meets upper_bound (the capacity bound
+    of bounds.py by default). verbose=True prints the progress of every iteration
+    and a summary at the end.
+    """
+    deadline = Deadline() if deadline is None else deadline
+    upper_bound = capacity_bound(inst)[0] if upper_bound is None else upper_bound
+    iterations = num_iterations if iterations is None else iterations
+    engine = SwarmEngine(inst, np.random.default_rng(seed))
+    hasher = ZobristHasher(inst.n_orders, inst.n_items, seed=hash_seed)
+    tabu = LRUCache(TABU_SIZE)
+    cache = LRUCache(CACHE_SIZE) if cache is None else cache
+
+    orders, choice = engine.initialize(num_particles)
+    order_hashes, choice_hashes = hasher.hash_orders(orders), hasher.hash_choices(choice)
+    with instrumentation.timer("psoV3.evaluate"):
+        fitness, visited, needed = engine.evaluate(orders, choice, cached_demand(engine, cache, orders, order_hashes))
+    for state_hash in (order_hashes ^ choice_hashes).tolist():
+        tabu.put(state_hash)
+
+    g = int(np.argmax(fitness))
+    global_best_fitness = float(fitness[g])
+    global_best_position = engine.position(orders[g], choice[g])
+    deadline.improved(global_best_position)
+    instrumentation.incumbent(global_best_fitness, "psoV3")
+
+    for iteration in range(iterations):
+        if deadline.expired() or reached(global_best_fitness, upper_bound):
+            break
+
+        if verbose:
+            print(f"Iteration {iteration + 1}/{iterations}")
+
+        with instrumentation.timer("psoV3.mutate"):
+            new_orders = engine.mutate_orders(orders, mutation_rate)
+            new_choice, choice_rows, choice_items = engine.mutate_aisles(choice, visited, needed, mutation_rate)
+
+        new_order_hashes, new_choice_hashes = order_hashes.copy(), choice_hashes.copy()
+        flip_rows, flip_orders = nonzero_2d(new_orders != orders)
+        hasher.flip_orders(new_order_hashes, flip_rows, flip_orders)
+        hasher.change_choices(new_choice_hashes, choice_rows, choice_items, choice[choice_rows, choice_items], new_choice[choice_rows, choice_items])
+
+        # Particles moving to a recently visited state stay where they are
+        moved = np.zeros(len(orders), dtype=bool)
+        for p, state_hash in enumerate((new_order_hashes ^ new_choice_hashes).tolist()):
+            if state_hash in tabu:
+                instrumentation.count("psoV3.tabu_hits")
                 continue
-
-            tabu_list.add(particle_hash)
-
-            fitness = calculate_fitness_with_cache(new_order_selection, new_aisle_assignment)
-
-            if fitness > particle['best_fitness']:
-                particle['best_fitness'] = fitness
-                particle['best_order_selection'] = new_order_selection
-                particle['best_aisle_assignment'] = new_aisle_assignment
-
-            if fitness > global_best_fitness:
-                global_best_fitness = fitness
-                global_best_position = (new_order_selection, new_aisle_assignment)
-                #salvar a solução na classe solution
-
-            particle['order_selection'] = new_order_selection
-            particle['aisle_assignment'] = new_aisle_assignment
-            particle['fitness'] = fitness
-
-        print(f"Best fitness so far: {global_best_fitness}")
-
+            tabu.put(state_hash)
+            moved[p] = True
+
+        with instrumentation.timer("psoV3.evaluate"):
+            demand = cached_demand(engine, cache, new_orders[moved], new_order_hashes[moved])
+            new_fitness, new_visited, new_needed = engine.evaluate(new_orders[moved], new_choice[moved], demand)
+        instrumentation.count("psoV3.evaluations", int(moved.sum()))
+
+        orders[moved], choice[moved] = new_orders[moved], new_choice[moved]
+        order_hashes[moved], choice_hashes[moved] = new_order_hashes[moved], new_choice_hashes[moved]
+        fitness[moved], visited[moved], needed[moved] = new_fitness, new_visited, new_needed
+
+        g = int(np.argmax(fitness))
+        if fitness[g] > global_best_fitness:
+            global_best_fitness = float(fitness[g])
+            global_best_position = engine.position(orders[g], choice[g])
+            deadline.improved(global_best_position)
+            instrumentation.incumbent(global_best_fitness, "psoV3")
+
+        if verbose:
+            print(f"Best fitness so far: {global_best_fitness}")
+
+    if verbose:
+        print(f"Best fitness: {global_best_fitness}, {format_gap(global_best_fitness, upper_bound)}")
+        print(f"Tabu store: {tabu.stats()}, demand cache: {cache.stats()}")
+    deadline.flush()
     return global_best_position, global_best_fitness
 
 
-def write_solution_to_file(best_solution, filename="best_solution.txt"):
-    visited_aisles = set()
-    order_selection = best_solution[0]
-    aisle_assignment = best_solution[1]
-
-    batch_items = defaultdict(int)
-    for order_idx in order_selection:
-        for item, qty in orders[order_idx].items():
-            batch_items[item] += qty
-
-    for item in batch_items.keys():
-        aisle = aisle_assignment[item]
-        visited_aisles.add(aisle)
-
-    with open(filename, "w") as file:
-        file.write(f"{len(order_selection)}\n")
-        for order_idx in order_selection:
-            file.write(f"{order_idx}\n")
-
-        file.write(f"{len(visited_aisles)}\n")
-        for aisle in visited_aisles:
-            file.write(f"{aisle}\n")
-
+if __name__ == "__main__":
+    # python psoV3.py [input_file]
+    reduction = reduce_instance(explorer.load(sys.argv[1] if len(sys.argv) > 1 else None))
+    order_ids, aisle_ids = reduction.order_ids.tolist(), reduction.aisle_ids.tolist()
+    # Positions of the reduced instance back in the original ids
+    original = lambda position: ([order_ids[o] for o in position[0]], [aisle_ids[a] for a in set(position[1].values())])
 
-best_solution, best_fitness = pso()
+    checkpoint = lambda position: write_solution(OUTPUT_FILE, *original(position))
+    best_solution, best_fitness = pso(reduction.instance, Deadline(TIME_LIMIT, checkpoint=checkpoint), verbose=True)
 
-write_solution_to_file(best_solution)
+    write_solution(OUTPUT_FILE, *original(best_solution))
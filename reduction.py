@@ -0,0 +1,184 @@
+import sys
+import numpy as np
+import explorer
+from instance import Instance, csr_positions
+
+
+class Reduction:
+    """
+    Reduced copy of an instance without provably useless orders and aisles, with the
+    index maps needed to write solutions in the original ids. Applied until nothing
+    changes:
+    - orders needing more of an item than all kept aisles stock, or more units than
+      wave_size_ub, can never be picked;
+    - aisles stocking no item demanded by the kept orders are never useful;
+    - an aisle is dropped when another kept aisle alone stocks the total demand of every
+      demanded item it carries: an optimal wave never needs both, and swapping it for
+      the other one keeps the wave feasible. (Plain stock dominance is not used, since
+      a wave may need a dominated aisle together with the one dominating it.)
+    Items no kept order demands are dropped too.
+    With merge_duplicates=True identical orders are merged into one order whose
+    multiplicity (the number of copies that may be picked) is kept in `multiplicity`;
+    only solvers with count variables (the compact IP model) can use that form.
+    """
+
+    def __init__(self, inst, merge_duplicates=False):
+        self.original = inst
+        self.aisle_replacement = {}
+        orders, aisles = self._useful(inst)
+
+        self.order_groups = None
+        self.multiplicity = None
+        self.order_ids = np.nonzero(orders)[0]
+        if merge_duplicates:
+            self.order_groups = self._identical_orders(inst, self.order_ids)
+            self.order_ids = np.array([group[0] for group in self.order_groups], dtype=np.int64)
+            self.multiplicity = np.array([len(group) for group in self.order_groups], dtype=np.int64)
+
+        self.aisle_ids = np.nonzero(aisles)[0]
+        self.item_ids = np.nonzero(self._demand(inst, orders) > 0)[0]
+        self.instance = self._build(inst)
+
+    @staticmethod
+    def _demand(inst, orders):
+        entries = orders[inst.order_rows]
+        return np.bincount(inst.order_items[entries], weights=inst.order_qty[entries], minlength=inst.n_items)
+
+    def _useful(self, inst):
+        orders = inst.order_units <= inst.wave_size_ub
+        aisles = np.ones(inst.n_aisles, dtype=bool)
+        aisle_rows = np.repeat(np.arange(inst.n_aisles), np.diff(inst.aisle_indptr))
+
+        while True:
+            kept = aisles[aisle_rows]
+            stock = np.bincount(inst.aisle_items[kept], weights=inst.aisle_qty[kept], minlength=inst.n_items)
+            short = inst.order_rows[stock[inst.order_items] < inst.order_qty]
+            new_orders = orders & (np.bincount(short, minlength=inst.n_orders) == 0)
+
+            demand = self._demand(inst, new_orders)
+            demanded = demand[inst.aisle_items] > 0
+            new_aisles = aisles & (np.bincount(aisle_rows[demanded], minlength=inst.n_aisles) > 0)
+            covered, replacement = self._covered_aisles(inst, new_aisles, demand)
+            new_aisles &= ~covered
+            self.aisle_replacement.update(replacement)
+
+            if np.array_equal(new_orders, orders) and np.array_equal(new_aisles, aisles):
+                return orders, aisles
+            orders, aisles = new_orders, new_aisles
+
+    @staticmethod
+    def _covered_aisles(inst, aisles, demand):
+        # Aisles whose demanded items are all fully stocked by one other kept aisle, and that aisle
+        indptr, item_aisles, qty = inst.item_aisles()
+        rows = np.repeat(np.arange(inst.n_items), np.diff(indptr))
+        full = (qty >= demand[rows]) & aisles[item_aisles] & (demand[rows] > 0)
+        full_sets = {}
+        for item, aisle in zip(rows[full].tolist(), item_aisles[full].tolist()):
+            full_sets.setdefault(item, set()).add(aisle)
+
+        removed = np.zeros(inst.n_aisles, dtype=bool)
+        replacement = {}
+        for a in np.nonzero(aisles)[0].tolist():
+            items, _ = inst.aisle(a)
+            others = None
+            for item in items[demand[items] > 0].tolist():
+                candidates = full_sets.get(item, set())
+                others = set(candidates) if others is None else others & candidates
+                others.discard(a)
+                if not others:
+                    break
+            kept = [b for b in sorted(others or ()) if not removed[b]]
+            if kept:
+                removed[a] = True
+                replacement[a] = kept[0]
+        return removed, replacement
+
+    @staticmethod
+    def _identical_orders(inst, order_ids):
+        # Groups of kept orders with the same items and quantities, in order of first id
+        groups = {}
+        for o in order_ids.tolist():
+            items, qty = inst.order(o)
+            perm = np.argsort(items)
+            groups.setdefault((items[perm].tobytes(), qty[perm].tobytes()), []).append(o)
+        return list(groups.values())
+
+    def _build(self, inst):
+        item_map = np.full(inst.n_items, -1, dtype=np.int64)
+        item_map[self.item_ids] = np.arange(len(self.item_ids))
+
+        positions = csr_positions(inst.order_indptr, self.order_ids)
+        order_indptr = np.zeros(len(self.order_ids) + 1, dtype=np.int64)
+        np.cumsum(inst.order_indptr[self.order_ids + 1] - inst.order_indptr[self.order_ids], out=order_indptr[1:])
+
+        aisle_positions = csr_positions(inst.aisle_indptr, self.aisle_ids)
+        aisle_rows = np.repeat(np.arange(len(self.aisle_ids)), inst.aisle_indptr[self.aisle_ids + 1] - inst.aisle_indptr[self.aisle_ids])
+        keep = item_map[inst.aisle_items[aisle_positions]] >= 0
+        aisle_positions, aisle_rows = aisle_positions[keep], aisle_rows[keep]
+        aisle_indptr = np.zeros(len(self.aisle_ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(aisle_rows, minlength=len(self.aisle_ids)), out=aisle_indptr[1:])
+
+        return Instance(len(self.item_ids),
+                        order_indptr, item_map[inst.order_items[positions]], inst.order_qty[positions].copy(),
+                        aisle_indptr, item_map[inst.aisle_items[aisle_positions]], inst.aisle_qty[aisle_positions].copy(),
+                        inst.wave_size_lb, inst.wave_size_ub)
+
+    def map_back(self, selected_orders, visited_aisles):
+        """
+        Original ids of a solution of the reduced instance. With merged orders a reduced
+        order may appear several times (once per copy picked) and maps to that many
+        distinct original orders of its group.
+        """
+        if self.order_groups is None:
+            orders = self.order_ids[np.asarray(list(selected_orders), dtype=np.int64)].tolist()
+        else:
+            picked = {}
+            for o in selected_orders:
+                picked[o] = picked.get(o, 0) + 1
+            orders = [original for o, copies in picked.items() for original in self.order_groups[o][:copies]]
+        aisles = self.aisle_ids[np.asarray(list(visited_aisles), dtype=np.int64)].tolist()
+        return orders, aisles
+
+    def map_forward(self, selected_orders, visited_aisles):
+        """
+        Ids in the reduced instance of a wave of the original one, e.g. an incumbent read
+        from disk. Removed aisles covered by another one are replaced by it (following the
+        chain of replacements) and aisles stocking no demanded item are left out, which
+        keeps a feasible wave feasible. Returns None if the wave uses a removed order.
+        """
+        order_map = np.full(self.original.n_orders, -1, dtype=np.int64)
+        if self.order_groups is None:
+            order_map[self.order_ids] = np.arange(len(self.order_ids))
+        else:
+            for g, group in enumerate(self.order_groups):
+                order_map[group] = g
+        orders = order_map[np.asarray(list(selected_orders), dtype=np.int64)]
+        if np.any(orders < 0):
+            return None
+
+        aisle_map = np.full(self.original.n_aisles, -1, dtype=np.int64)
+        aisle_map[self.aisle_ids] = np.arange(len(self.aisle_ids))
+        aisles = set()
+        for a in visited_aisles:
+            while a in self.aisle_replacement and aisle_map[a] < 0:
+                a = self.aisle_replacement[a]
+            if aisle_map[a] >= 0:
+                aisles.add(int(aisle_map[a]))
+        return orders.tolist(), sorted(aisles)
+
+    def stats(self):
+        reduced = self.instance
+        return {"orders": (self.original.n_orders, reduced.n_orders),
+                "aisles": (self.original.n_aisles, reduced.n_aisles),
+                "items": (self.original.n_items, reduced.n_items)}
+
+
+def reduce_instance(inst, merge_duplicates=False):
+    return Reduction(inst, merge_duplicates)
+
+
+if __name__ == "__main__":
+    # python reduction.py [input_file]
+    inst = explorer.load(sys.argv[1] if len(sys.argv) > 1 else None)
+    for name, (before, after) in reduce_instance(inst, merge_duplicates=True).stats().items():
+        print(f"{name}: {before} -> {after}")
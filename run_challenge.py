@@ -2,6 +2,9 @@ import os
 import subprocess
 import sys
 import platform
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from checker import check_solution, write_summary
 
 # Paths to the libraries
 CPLEX_PATH = "$HOMEcplex/bin/x86-64_linux/"
@@ -11,6 +14,10 @@ USE_CPLEX = True
 USE_OR_TOOLS = True
 
 MAX_RUNNING_TIME = "605s"
+TIMEOUT_EXIT_CODE = 124  # exit code of `timeout` when the time limit is hit
+
+# Memory left to the OS and the checker when splitting the -Xmx budget between parallel jobs
+MEMORY_RESERVE_MB = 2048
 
 def compile_code(source_folder):
     print(f"Compiling code in {source_folder}...")
@@ -29,13 +36,7 @@ def compile_code(source_folder):
     return True
 
 
-def run_benchmark(source_folder, input_folder, output_folder):
-    # Change to the source folder
-    os.chdir(source_folder)
-
-    if not os.path.exists(output_folder):
-        os.makedirs(output_folder)
-
+def java_command(input_file, output_file, max_heap="16g"):
     # Set the library path (if needed)
     if USE_CPLEX and USE_OR_TOOLS:
         libraries = f"{OR_TOOLS_PATH}:{CPLEX_PATH}"
@@ -49,33 +50,118 @@ def run_benchmark(source_folder, input_folder, output_folder):
     else:
         timeout_command = "timeout"
 
+    # Main Java command
+    cmd = [timeout_command, MAX_RUNNING_TIME, "java", f"-Xmx{max_heap}", "-jar", "target/ChallengeSBPO2025-1.0.jar",
+           input_file,
+           output_file]
+    if USE_CPLEX or USE_OR_TOOLS:
+        cmd.insert(3, f"-Djava.library.path={libraries}")
+    return cmd
+
+
+def run_benchmark(source_folder, input_folder, output_folder):
+    # Change to the source folder
+    os.chdir(source_folder)
+
+    if not os.path.exists(output_folder):
+        os.makedirs(output_folder)
+
     for filename in os.listdir(input_folder):
         if filename.endswith(".txt"):
             print(f"Running {filename}")
             input_file = os.path.join(input_folder, filename)
             output_file = os.path.join(output_folder, f"{os.path.splitext(filename)[0]}.txt")
             with open(output_file, "w") as out:
-                # Main Java command
-                cmd = [timeout_command, MAX_RUNNING_TIME, "java", "-Xmx16g", "-jar", "target/ChallengeSBPO2025-1.0.jar",
-                       input_file,
-                       output_file]
-                if USE_CPLEX or USE_OR_TOOLS:
-                    cmd.insert(3, f"-Djava.library.path={libraries}")
-
-                result = subprocess.run(cmd, stderr=subprocess.PIPE, text=True)
+                result = subprocess.run(java_command(input_file, output_file), stderr=subprocess.PIPE, text=True)
                 if result.returncode != 0:
                     print(f"Execution failed for {input_file}:")
                     print(result.stderr)
 
 
+def heap_per_job(workers):
+    # Splits the physical memory minus a reserve for the OS and the checker between the jobs, in MB
+    total_mb = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") // (1024 * 1024)
+    return f"{max(256, (total_mb - MEMORY_RESERVE_MB) // workers)}m"
+
+
+def run_job(input_file, output_file, max_heap):
+    # A solution left by an earlier run must not be checked as this run's output
+    try:
+        os.remove(output_file)
+    except FileNotFoundError:
+        pass
+
+    start = time.monotonic()
+    result = subprocess.run(java_command(input_file, output_file, max_heap), stdout=subprocess.DEVNULL,
+                            stderr=subprocess.PIPE, text=True)
+    report = {
+        "exit_code": result.returncode,
+        "timed_out": result.returncode == TIMEOUT_EXIT_CODE,
+        "runtime": round(time.monotonic() - start, 3),
+        "stderr": result.stderr[-2000:],
+    }
+    report.update(check_solution(input_file, output_file))
+    if report["timed_out"]:
+        report["status"] = "timeout"
+    elif result.returncode != 0:
+        report["status"] = "failed"
+    return report
+
+
+def run_parallel(source_folder, input_folder, output_folder, workers=None, max_heap=None, report_file=None):
+    """
+    Scheduler mode: runs up to `workers` instances at once, each JVM capped at max_heap
+    (the machine memory split between the workers by default). Jobs are started
+    largest instance first so the long ones do not end up last, progress is printed as
+    jobs finish, and every job's exit code, runtime and checker result are collected
+    into one report (JSON, or CSV for a .csv report_file).
+    """
+    workers = workers or max(1, (os.cpu_count() or 1) // 2)
+    max_heap = max_heap or heap_per_job(workers)
+
+    input_folder, output_folder = os.path.abspath(input_folder), os.path.abspath(output_folder)
+    os.chdir(source_folder)
+    os.makedirs(output_folder, exist_ok=True)
+
+    input_files = [os.path.join(input_folder, f) for f in os.listdir(input_folder) if f.endswith(".txt")]
+    input_files.sort(key=os.path.getsize, reverse=True)
+    print(f"Running {len(input_files)} instances on {workers} workers with -Xmx{max_heap}")
+
+    results = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        jobs = {}
+        for input_file in input_files:
+            output_file = os.path.join(output_folder, os.path.basename(input_file))
+            jobs[executor.submit(run_job, input_file, output_file, max_heap)] = input_file
+
+        for done, job in enumerate(as_completed(jobs), start=1):
+            result = job.result()
+            results.append(result)
+            print(f"[{done}/{len(jobs)}] {result['instance']}: {result['status']} (exit {result['exit_code']}) "
+                  f"in {result['runtime']:.1f}s, "
+                  f"feasible={result['feasible']} objective={result['objective']}", flush=True)
+
+    results.sort(key=lambda r: r["instance"])
+    write_summary(results, report_file)
+    return results
+
+
 if __name__ == "__main__":
-    if len(sys.argv) != 4:
-        print("Usage: python run_challenge.py <source_folder> <input_folder> <output_folder>")
+    # python run_challenge.py <source_folder> <input_folder> <output_folder> [--workers N] [--xmx 8g] [--report report.json]
+    if len(sys.argv) < 4 or len(sys.argv) % 2 != 0:
+        print("Usage: python run_challenge.py <source_folder> <input_folder> <output_folder> "
+              "[--workers N] [--xmx HEAP] [--report <report.json|report.csv>]")
         sys.exit(1)
 
-    source_folder = sys.argv[1]
-    input_folder = sys.argv[2]
-    output_folder = sys.argv[3]
+    source_folder = os.path.abspath(sys.argv[1])
+    input_folder = os.path.abspath(sys.argv[2])
+    output_folder = os.path.abspath(sys.argv[3])
+    options = dict(zip(sys.argv[4::2], sys.argv[5::2]))
 
     if compile_code(source_folder):
-        run_benchmark(source_folder, input_folder, output_folder)
+        if options:
+            workers = int(options["--workers"]) if "--workers" in options else None
+            run_parallel(source_folder, input_folder, output_folder, workers, options.get("--xmx"),
+                         options.get("--report", os.path.join(output_folder, "report.json")))
+        else:
+            run_benchmark(source_folder, input_folder, output_folder)
@@ -2,17 +2,10 @@
 
 INPUT_DIR="./datasets/a"
 OUTPUT_DIR="./outputs"
+SUMMARY_FILE="$OUTPUT_DIR/checker_summary.json"
 
 mkdir -p "$OUTPUT_DIR"
 
-
-for i in {0001..0020}; do
-    output_file="$OUTPUT_DIR/out_$i.txt"
-    input_file="$INPUT_DIR/instance_$i.txt"
-    if [[ -f "$output_file" ]]; then
-        echo "Processing $output_file"
-        python3 checker.py "$input_file" "$output_file"
-    else
-        echo "File $output_file not found"
-    fi
-done
\ No newline at end of file
+# Validates every out_XXXX.txt against instance_XXXX.txt in parallel and writes one summary
+python3 checker.py --batch "$INPUT_DIR" "$OUTPUT_DIR" "$SUMMARY_FILE"
+echo "Summary written to $SUMMARY_FILE"
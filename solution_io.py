@@ -0,0 +1,92 @@
+import os
+import sys
+import numpy as np
+
+# Compact binary solutions: magic, uint32 order and aisle counts, then the sorted uint32 ids
+BINARY_MAGIC = b"WOP1"
+BINARY_SUFFIX = ".bin"
+
+
+def _ids(values):
+    # Sorted unique ids as uint32; ids outside that range raise instead of wrapping around
+    values = values if isinstance(values, np.ndarray) else list(values)
+    ids = np.unique(np.asarray(values, dtype=np.int64))
+    if len(ids) and (ids[0] < 0 or ids[-1] > np.iinfo(np.uint32).max):
+        raise ValueError(f"solution ids must lie in [0, {np.iinfo(np.uint32).max}]")
+    return ids.astype(np.uint32)
+
+
+def is_binary(path):
+    with open(path, "rb") as file:
+        return file.read(len(BINARY_MAGIC)) == BINARY_MAGIC
+
+
+def write_solution(path, selected_orders, visited_aisles, binary=None, sync=False):
+    """
+    Writes a wave to `path` in the challenge text format (order count, order ids, aisle
+    count, aisle ids, one number per line) or, with binary=True, in the compact binary
+    format; by default the format follows the file suffix. Ids are written sorted and
+    without duplicates, and ids outside the uint32 range raise ValueError. The file is
+    written next to the target and renamed over it, so a reader (or a run killed
+    mid-checkpoint) only ever sees a complete solution.
+    sync=True also fsyncs before the rename, at the cost of a disk flush.
+    """
+    binary = path.endswith(BINARY_SUFFIX) if binary is None else binary
+    orders, aisles = _ids(selected_orders), _ids(visited_aisles)
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, "wb") as file:
+        if binary:
+            file.write(BINARY_MAGIC)
+            file.write(np.array([len(orders), len(aisles)], dtype=np.uint32).tobytes())
+            file.write(orders.tobytes())
+            file.write(aisles.tobytes())
+        else:
+            lines = [str(len(orders)), *map(str, orders.tolist()), str(len(aisles)), *map(str, aisles.tolist())]
+            file.write(("\n".join(lines) + "\n").encode())
+        if sync:
+            file.flush()
+            os.fsync(file.fileno())
+    os.replace(tmp, path)
+
+
+def _read_block(lines):
+    # One count line followed by that many ids, read lazily from the line iterator
+    count = int(next(lines))
+    ids = [int(line) for _, line in zip(range(count), lines)]
+    if len(ids) < count:
+        raise ValueError(f"truncated solution: expected {count} ids, found {len(ids)}")
+    return ids
+
+
+def read_solution(path):
+    """
+    Reads a solution in either format and returns (selected_orders, visited_aisles) as
+    lists of ints. Text files are parsed line by line without loading the whole file;
+    a file ending before its counts are met raises ValueError.
+    """
+    with open(path, "rb") as file:
+        if file.read(len(BINARY_MAGIC)) == BINARY_MAGIC:
+            counts = np.frombuffer(file.read(8), dtype=np.uint32)
+            if len(counts) < 2:
+                raise ValueError("truncated solution header")
+            ids = np.fromfile(file, dtype=np.uint32, count=int(counts.sum()))
+            if len(ids) < counts.sum():
+                raise ValueError(f"truncated solution: expected {int(counts.sum())} ids, found {len(ids)}")
+            return ids[:counts[0]].tolist(), ids[counts[0]:].tolist()
+
+    with open(path) as file:
+        lines = (line for line in file if line.strip())
+        try:
+            selected_orders = _read_block(lines)
+            visited_aisles = _read_block(lines)
+        except StopIteration:
+            raise ValueError("truncated solution: missing count line")
+    return selected_orders, visited_aisles
+
+
+if __name__ == "__main__":
+    # python solution_io.py <solution> <converted>: converts between formats, chosen by suffix
+    if len(sys.argv) != 3:
+        print(f"Usage: python solution_io.py <solution> <converted>  ({BINARY_SUFFIX} files are binary)")
+        sys.exit(1)
+    write_solution(sys.argv[2], *read_solution(sys.argv[1]))
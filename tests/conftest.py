@@ -0,0 +1,70 @@
+import itertools
+import os
+import sys
+import pytest
+
+# The solvers are flat top-level modules of the repository root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from instance import read_instance
+
+
+# Toy instance shared by the solver tests: 5 orders over 3 items, 3 aisles
+TOY_ITEMS = 3
+TOY_ORDERS = [{0: 3}, {1: 2}, {0: 1, 2: 1}, {2: 4}, {1: 1}]
+TOY_AISLES = [{0: 4, 1: 2}, {2: 5}, {1: 1, 2: 1}]
+
+
+def write_instance(path, n_items, orders, aisles, wave_size_lb, wave_size_ub):
+    # Writes orders and aisles (lists of {item: qty} dicts) in the challenge text format
+    rows = lambda book: [" ".join([str(len(row))] + [f"{i} {q}" for i, q in row.items()]) for row in book]
+    lines = [f"{len(orders)} {n_items} {len(aisles)}", *rows(orders), *rows(aisles), f"{wave_size_lb} {wave_size_ub}"]
+    with open(path, "w") as file:
+        file.write("\n".join(lines) + "\n")
+    return path
+
+
+def random_book(rng, rows, n_items, max_qty, max_items=2):
+    # `rows` random {item: qty} dicts of 1 to max_items distinct items, drawn from a random.Random
+    book = []
+    for _ in range(rows):
+        items = rng.sample(range(n_items), rng.randint(1, max_items))
+        book.append({i: rng.randint(1, max_qty) for i in items})
+    return book
+
+
+def brute_force(inst):
+    # Best units / aisles over every order and aisle subset of a tiny instance, or 0.0
+    orders, aisles = inst.order_dicts(), inst.aisle_dicts()
+    best = 0.0
+    for k in range(1, inst.n_aisles + 1):
+        for visited in itertools.combinations(range(inst.n_aisles), k):
+            stock = {}
+            for a in visited:
+                for i, q in aisles[a].items():
+                    stock[i] = stock.get(i, 0) + q
+            for n in range(1, inst.n_orders + 1):
+                for wave in itertools.combinations(range(inst.n_orders), n):
+                    demand = {}
+                    for o in wave:
+                        for i, q in orders[o].items():
+                            demand[i] = demand.get(i, 0) + q
+                    units = sum(demand.values())
+                    if (inst.wave_size_lb <= units <= inst.wave_size_ub
+                            and all(stock.get(i, 0) >= q for i, q in demand.items())):
+                        best = max(best, units / k)
+    return best
+
+
+@pytest.fixture
+def make_instance(tmp_path):
+    def make(n_items, orders, aisles, wave_size_lb, wave_size_ub, name="instance.txt"):
+        path = write_instance(str(tmp_path / name), n_items, orders, aisles, wave_size_lb, wave_size_ub)
+        return read_instance(path)
+    return make
+
+
+@pytest.fixture
+def toy_instance(make_instance):
+    return make_instance(TOY_ITEMS, TOY_ORDERS, TOY_AISLES, 1, 10)
@@ -0,0 +1,57 @@
+import itertools
+import random
+import numpy as np
+import pytest
+from aisle_cover import cover_dicts, cover_engine
+from conftest import random_book
+
+
+def minimum_cover(inst, demand):
+    # Size of the smallest aisle set covering the demand, by enumeration, or None
+    for k in range(1, inst.n_aisles + 1):
+        for aisles in itertools.combinations(range(inst.n_aisles), k):
+            if np.all(inst.supply(aisles) >= demand):
+                return k
+    return None
+
+
+def random_instance(make_instance, seed):
+    rng = random.Random(seed)
+    return make_instance(5, [{0: 1}], random_book(rng, 7, 5, 4, max_items=3), 1, 1)
+
+
+@pytest.mark.parametrize("seed", range(15))
+def test_covers_are_feasible_and_exact_is_minimum(make_instance, seed):
+    inst = random_instance(make_instance, seed)
+    rng = np.random.default_rng(seed)
+    engine = cover_engine(inst)
+    for _ in range(5):
+        demand = rng.integers(0, 4, size=inst.n_items) * (rng.random(inst.n_items) < 0.6)
+        best = minimum_cover(inst, demand) if demand.any() else 0
+        greedy = engine.cover(demand)
+        exact = engine.cover(demand, exact=True)
+        if best is None:
+            assert greedy is None and exact is None
+            continue
+        assert np.all(inst.supply(greedy) >= demand) and len(greedy) >= best
+        assert np.all(inst.supply(exact) >= demand) and len(exact) == best
+
+
+def test_allowed_aisles_and_cache(make_instance):
+    inst = make_instance(2, [{0: 1}], [{0: 2, 1: 2}, {0: 2}, {1: 2}], 1, 1)
+    engine = cover_engine(inst)
+    assert engine is cover_engine(inst)
+    demand = np.array([2, 2])
+    assert engine.cover(demand, exact=True) == [0]
+    assert engine.cover(demand, exact=True) == [0]
+    assert engine.cache.hits >= 1
+    allowed = np.array([False, True, True])
+    assert engine.cover(demand, allowed, exact=True) == [1, 2]
+    assert engine.cover(np.array([3, 0]), allowed) is None
+
+
+def test_cover_dicts():
+    book = {0: {0: 2, 1: 2}, 1: {1: 1, 2: 3}}
+    assert cover_dicts({0: 2, 1: 1}, book, exact=True) == [1]
+    assert sorted(cover_dicts({0: 4, 1: 3}, book)) == [0, 1, 2]
+    assert cover_dicts({0: 5}, book) is None
@@ -0,0 +1,18 @@
+import benchmark
+import psoV3
+from conftest import TOY_AISLES, TOY_ITEMS, TOY_ORDERS, write_instance
+
+
+def test_benchmark_run_passes_iterations(tmp_path):
+    input_file = write_instance(str(tmp_path / "instance_0001.txt"), TOY_ITEMS, TOY_ORDERS, TOY_AISLES, 1, 10)
+    default = psoV3.num_iterations
+    result = benchmark._benchmark_run("psoV3", input_file, 0, 0, 3, None)
+    assert result["feasible"] and result["iterations"] == 3
+    assert psoV3.num_iterations == default
+
+
+def test_peak_rss_without_resource(monkeypatch):
+    assert benchmark.peak_rss_mb() > 0
+    monkeypatch.setattr(benchmark, "resource", None)
+    monkeypatch.setattr(benchmark, "psutil", None)
+    assert benchmark.peak_rss_mb() is None
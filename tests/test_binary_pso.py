@@ -0,0 +1,32 @@
+import numpy as np
+import pso
+from checker import WaveOrderPicking
+from conftest import TOY_AISLES, TOY_ITEMS, TOY_ORDERS, brute_force
+
+def test_cover_fitness_matches_checker(make_instance):
+    inst = make_instance(TOY_ITEMS, TOY_ORDERS, TOY_AISLES, 2, 8)
+    evaluator = pso.CoverEvaluator(inst)
+    orders = np.random.default_rng(0).random((64, inst.n_orders)) < 0.5
+    fitness = evaluator.evaluate(orders)
+    checker = WaveOrderPicking(inst)
+    for p in range(len(orders)):
+        selected, aisles = evaluator.wave(orders[p])
+        if fitness[p] > 0:
+            assert checker.is_solution_feasible(selected, aisles)
+            assert fitness[p] == checker.compute_objective_function(selected, aisles)
+        else:
+            units = sum(inst.order_units[o] for o in selected)
+            short = np.any(inst.demand(orders[p]) > inst.item_stock)
+            assert short or not inst.wave_size_lb <= units <= inst.wave_size_ub or not selected
+
+
+def test_binary_pso_returns_a_feasible_wave(toy_instance, capsys):
+    selected, aisles, ratio = pso.binary_pso(toy_instance, num_particles=50, max_iterations=20, seed=0)
+    checker = WaveOrderPicking(toy_instance)
+    assert ratio > 0 and checker.is_solution_feasible(selected, aisles)
+    assert ratio == checker.compute_objective_function(selected, aisles)
+    assert ratio <= brute_force(toy_instance) + 1e-9
+    assert "Iteration" not in capsys.readouterr().out
+
+    pso.binary_pso(toy_instance, num_particles=50, max_iterations=2, seed=0, verbose=True)
+    assert "Iteration 2/2" in capsys.readouterr().out
@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+from bitset import aisle_bitsets, from_bool, from_ids, to_ids
+
+
+@pytest.mark.parametrize("ids", [[], [0], [3, 1, 7], [0, 63, 64, 65, 200]])
+def test_round_trips(ids):
+    n = 201
+    flags = np.zeros(n, dtype=bool)
+    flags[ids] = True
+
+    mask = from_ids(ids)
+    assert to_ids(mask) == sorted(ids)
+    assert from_bool(flags) == mask
+    assert from_ids(to_ids(mask)) == mask
+
+
+def test_aisle_bitsets(make_instance):
+    inst = make_instance(3, [{0: 1}], [{0: 1, 1: 2}, {2: 1}, {}, {1: 1}], 1, 1)
+    bitsets = aisle_bitsets(inst)
+    assert bitsets is aisle_bitsets(inst)
+    assert to_ids(bitsets.stocked) == [0, 1, 3]
+    assert to_ids(bitsets.aisles_with([1])) == [0, 3]
+    assert to_ids(bitsets.aisles_with([0, 2])) == [0, 1]
@@ -0,0 +1,36 @@
+import random
+import subprocess
+import sys
+import pytest
+from bounds import capacity_bound, useful_stock
+from conftest import ROOT, brute_force, random_book
+from reduction import reduce_instance
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_capacity_bound_is_valid(make_instance, seed):
+    rng = random.Random(seed)
+    inst = make_instance(3, random_book(rng, 5, 3, 3), random_book(rng, 3, 3, 4), 1, rng.randint(3, 8))
+    bound, _ = capacity_bound(inst)
+    assert bound >= brute_force(inst) - 1e-9
+
+
+def test_bound_counts_merged_copies(make_instance):
+    # Three identical orders merge into one with multiplicity 3; the best wave picks all
+    # of them from the first aisle (6 units / 1 aisle)
+    inst = make_instance(2, [{0: 2}, {0: 2}, {0: 2}, {1: 1}], [{0: 6}, {1: 1}], 1, 10)
+    optimum = brute_force(inst)
+    assert optimum == 6
+
+    reduction = reduce_instance(inst, merge_duplicates=True)
+    assert reduction.multiplicity.tolist() == [3, 1]
+    assert useful_stock(reduction.instance, reduction.multiplicity).tolist() == [6, 1]
+    bound, k = capacity_bound(reduction.instance, reduction.multiplicity)
+    assert bound >= optimum and k == 1
+    assert capacity_bound(reduction.instance)[0] < optimum
+
+
+def test_heuristics_do_not_import_pulp():
+    # pulp is only needed by lp_bound and the IP drivers, and requirements.txt does not list it
+    code = "import sys, graspV2, psoV3; sys.exit('pulp' in sys.modules)"
+    assert subprocess.run([sys.executable, "-c", code], cwd=ROOT).returncode == 0
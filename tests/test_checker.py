@@ -0,0 +1,44 @@
+import os
+import subprocess
+import sys
+from conftest import ROOT, write_instance
+from checker import WaveOrderPicking, check_directory
+from solution_io import write_solution
+
+ORDERS = [{0: 2}, {1: 1}]
+AISLES = [{0: 2}, {1: 1}]
+
+
+def run_batch(input_folder, output_folder):
+    return subprocess.run([sys.executable, os.path.join(ROOT, "checker.py"), "--batch", input_folder, output_folder,
+                           os.path.join(output_folder, "summary.json")], capture_output=True).returncode
+
+
+def test_batch_fails_on_missing_solutions(tmp_path):
+    inputs, outputs = tmp_path / "inputs", tmp_path / "outputs"
+    inputs.mkdir()
+    outputs.mkdir()
+    for number in (1, 2):
+        write_instance(str(inputs / f"instance_{number:04d}.txt"), 2, ORDERS, AISLES, 1, 3)
+    write_solution(str(outputs / "instance_0001.txt"), [0, 1], [0, 1])
+
+    results = check_directory(str(inputs), str(outputs))
+    assert [r["status"] for r in results] == ["ok", "missing"]
+    assert results[0]["feasible"] and results[0]["objective"] == 1.5
+    assert run_batch(str(inputs), str(outputs)) == 2
+
+    write_solution(str(outputs / "instance_0002.txt"), [0], [0])
+    assert run_batch(str(inputs), str(outputs)) == 0
+
+    write_solution(str(outputs / "instance_0002.txt"), [0], [1])
+    assert run_batch(str(inputs), str(outputs)) == 2
+
+
+def test_wave_order_picking(make_instance):
+    checker = WaveOrderPicking(make_instance(2, ORDERS, AISLES, 1, 3))
+    assert checker.orders == ORDERS
+    assert checker.aisles == AISLES
+    assert checker.is_solution_feasible([0, 1], [0, 1])
+    assert not checker.is_solution_feasible([0, 1], [0])
+    assert checker.compute_objective_function([0, 1], [0, 1]) == 1.5
+    assert checker.compute_objective_function([], []) == 0.0
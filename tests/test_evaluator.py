@@ -0,0 +1,61 @@
+import random
+import numpy as np
+import pytest
+from checker import WaveOrderPicking
+from conftest import TOY_AISLES, TOY_ORDERS
+from evaluator import IncrementalEvaluator, ADD_AISLE, ADD_ORDER, DROP_AISLE, DROP_ORDER
+
+# The toy instance with a fourth item, ordered by the last order and stocked by a fourth aisle
+ORDERS = TOY_ORDERS[:4] + [{1: 1, 3: 2}]
+AISLES = TOY_AISLES + [{3: 2, 0: 1}]
+
+
+def snapshot(state):
+    return (state.order_selected.copy(), state.aisle_selected.copy(), state.stock.copy(), state.demand.copy(),
+            state.units, state.num_aisles, state.num_short)
+
+
+def assert_consistent(state):
+    # Every incremental field matches a state rebuilt from scratch
+    fresh = IncrementalEvaluator(state.inst, state.selected_orders(), state.visited_aisles())
+    for now, rebuilt in zip(snapshot(state), snapshot(fresh)):
+        assert np.array_equal(now, rebuilt)
+    checker = WaveOrderPicking(state.inst)
+    assert state.is_feasible() == checker.is_solution_feasible(list(state.selected_orders()), list(state.visited_aisles()))
+
+
+def random_move(rng, state):
+    if rng.random() < 0.6:
+        o = rng.randrange(state.inst.n_orders)
+        return (DROP_ORDER if state.order_selected[o] else ADD_ORDER), o
+    a = rng.randrange(state.inst.n_aisles)
+    return (DROP_AISLE if state.aisle_selected[a] else ADD_AISLE), a
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_moves_peek_and_undo(make_instance, seed):
+    rng = random.Random(seed)
+    state = IncrementalEvaluator(make_instance(4, ORDERS, AISLES, 2, 8), [0], [0])
+    marks = []
+    for _ in range(40):
+        move, idx = random_move(rng, state)
+        peeked = state.peek(move, idx)
+        marks.append((state.mark(), snapshot(state)))
+        state.apply(move, idx)
+        assert peeked == (state.units, state.num_aisles, state.is_feasible())
+        assert_consistent(state)
+
+    # Undoing to every mark restores the exact state it was taken in
+    for mark, before in reversed(marks[::7]):
+        state.undo_to(mark)
+        for now, then in zip(snapshot(state), before):
+            assert np.array_equal(now, then)
+        assert_consistent(state)
+
+
+def test_invalid_moves_raise(make_instance):
+    state = IncrementalEvaluator(make_instance(4, ORDERS, AISLES, 2, 8), [0], [0])
+    with pytest.raises(ValueError):
+        state.apply(ADD_ORDER, 0)
+    with pytest.raises(ValueError):
+        state.peek(DROP_AISLE, 1)
@@ -0,0 +1,50 @@
+import multiprocessing
+import random
+import time
+import graspV2
+from budget import Deadline
+from conftest import TOY_AISLES, TOY_ITEMS, TOY_ORDERS, brute_force, write_instance
+from instance import read_instance
+
+def test_deadline_stops_on_shared_event():
+    stop = multiprocessing.Event()
+    deadline = Deadline(stop=stop)
+    assert not deadline.expired()
+    stop.set()
+    assert deadline.expired()
+
+
+def test_grasp_finds_the_optimum(toy_instance):
+    solution = graspV2.grasp_aisle_based_batch(toy_instance, iterations=20, rng=random.Random(0))
+    assert solution[4] == brute_force(toy_instance)
+
+
+def test_parallel_grasp_stops_at_the_bound(tmp_path):
+    # The capacity bound (6 units from aisle 0) is met, so the remaining tasks are dropped
+    input_file = write_instance(str(tmp_path / "instance.txt"), 2, [{0: 2}, {0: 2}, {0: 2}, {1: 1}], [{0: 6}, {1: 1}], 1, 10)
+    checkpoints = []
+    start = time.monotonic()
+    solution = graspV2.parallel_grasp(input_file, iterations=10 ** 6, workers=2, seed=0, task_size=10 ** 4,
+                                      time_limit=60, checkpoint=checkpoints.append, reduce=True)
+    assert time.monotonic() - start < 30
+    assert solution[4] == brute_force(read_instance(input_file))
+    assert checkpoints and checkpoints[-1] is solution
+
+
+def test_grasp_tasks():
+    assert list(graspV2._grasp_tasks(12, 5, None)) == [(5, None), (5, None), (2, None)]
+
+    end_time = time.time() + 60
+    iterations, task_end = next(graspV2._grasp_tasks(None, 5, end_time))
+    assert iterations is None and task_end <= time.time() + graspV2.TASK_SECONDS
+    assert list(graspV2._grasp_tasks(None, 5, time.time() - 1)) == []
+
+
+def test_time_limited_grasp_resubmits_tasks(tmp_path, monkeypatch):
+    monkeypatch.setattr(graspV2, "TASK_SECONDS", 0.2)
+    input_file = write_instance(str(tmp_path / "instance.txt"), TOY_ITEMS, TOY_ORDERS, TOY_AISLES, 1, 10)
+    checkpoints = []
+    solution = graspV2.parallel_grasp(input_file, iterations=None, workers=2, seed=0, time_limit=1.5,
+                                      checkpoint=checkpoints.append, reduce=True)
+    assert solution[4] == brute_force(read_instance(input_file))
+    assert checkpoints[-1] is solution
@@ -0,0 +1,33 @@
+import numpy as np
+from conftest import TOY_AISLES, TOY_ORDERS, write_instance
+from instance import CACHE_ARRAYS, cache_path, load_instance, read_instance
+
+# The toy instance with an empty aisle
+ORDERS = TOY_ORDERS[:4]
+AISLES = TOY_AISLES[:2] + [{}] + TOY_AISLES[2:]
+
+
+def test_read_instance(tmp_path):
+    inst = read_instance(write_instance(str(tmp_path / "instance.txt"), 3, ORDERS, AISLES, 2, 9))
+    assert (inst.n_orders, inst.n_items, inst.n_aisles) == (4, 3, 4)
+    assert (inst.wave_size_lb, inst.wave_size_ub) == (2, 9)
+    assert inst.order_dicts() == ORDERS
+    assert inst.aisle_dicts() == AISLES
+    assert inst.order_units.tolist() == [3, 2, 2, 4]
+    assert inst.item_stock.tolist() == [4, 3, 6]
+
+
+def test_cache_matches_text(tmp_path):
+    input_file = write_instance(str(tmp_path / "instance.txt"), 3, ORDERS, AISLES, 2, 9)
+    parsed = read_instance(input_file)
+    compiled = load_instance(input_file)
+    cached = load_instance(input_file)
+    assert cache_path(input_file).startswith(str(tmp_path))
+    for name in CACHE_ARRAYS:
+        assert np.array_equal(getattr(cached, name), getattr(parsed, name))
+        assert np.array_equal(getattr(compiled, name), getattr(parsed, name))
+    assert (cached.n_items, cached.wave_size_lb, cached.wave_size_ub) == (3, 2, 9)
+
+    # A changed source file invalidates the cache
+    write_instance(input_file, 3, ORDERS[:2], AISLES, 1, 5)
+    assert load_instance(input_file).order_dicts() == ORDERS[:2]
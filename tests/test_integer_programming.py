@@ -0,0 +1,54 @@
+import importlib
+import random
+import pulp
+import pytest
+import graspV2
+from budget import Deadline
+from conftest import TOY_AISLES, TOY_ITEMS, TOY_ORDERS, brute_force
+from reduction import reduce_instance
+
+ip = importlib.import_module("integer-programaming")
+
+pytestmark = pytest.mark.skipif(not pulp.PULP_CBC_CMD(msg=False).available(), reason="CBC is not available")
+
+
+@pytest.fixture
+def inst(make_instance):
+    # The toy instance without its last order, so that the best wave at lam = 4.5 is unique
+    return make_instance(TOY_ITEMS, TOY_ORDERS[:4], TOY_AISLES, 1, 10)
+
+
+def test_cutoff_prunes_waves_below_it(inst):
+    # At lam = 4.5 the best wave (orders 0 and 1 from aisle 0) scores 5 - 4.5 = 0.5
+    model = ip.build_compact_model(inst)
+    assert ip.solve_parametric(*model, 4.5, cutoff=0.4) == ([0, 1], [0])
+    assert ip.solve_parametric(*model, 4.5, cutoff=0.6) is None
+    assert model[0].status == pulp.LpStatusInfeasible
+
+
+def test_dinkelbach_proves_grasp_wave_optimal(inst, capsys):
+    solution = graspV2.grasp_aisle_based_batch(inst, iterations=20, rng=random.Random(0))
+    assert solution[4] == brute_force(inst)
+
+    best = ip.dinkelbach(inst, incumbent=(sorted(solution[0]), sorted(solution[3])))
+    assert best[2] == solution[4]
+    assert "Ratio-optimal" in capsys.readouterr().out
+
+
+def test_dinkelbach_improves_a_poor_incumbent(inst, capsys):
+    best = ip.dinkelbach(inst, incumbent=([3], [1]))
+    assert best[2] == brute_force(inst)
+    assert "Ratio-optimal" in capsys.readouterr().out
+
+
+def test_grasp_incumbent_keeps_duplicate_orders(make_instance):
+    # The three copies of order {0: 2} merge into one; the best wave picks all of them
+    inst = make_instance(2, [{0: 2}, {0: 2}, {0: 2}, {1: 1}], [{0: 6}, {1: 1}], 1, 10)
+    reduction = reduce_instance(inst, merge_duplicates=True)
+    assert reduction.multiplicity.tolist() == [3, 1]
+
+    selected_orders, visited_aisles = ip.load_incumbent(reduction, grasp_seconds=60)
+    order_units = reduction.instance.order_units
+    ratio = sum(order_units[o] for o in selected_orders) / len(visited_aisles)
+    plain = graspV2.grasp_aisle_based_batch(inst, iterations=None, rng=random.Random(0), deadline=Deadline(60))
+    assert ratio >= plain[4] == brute_force(inst) == 6
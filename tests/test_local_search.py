@@ -0,0 +1,96 @@
+import random
+import numpy as np
+import pytest
+import graspV2
+from checker import WaveOrderPicking
+from conftest import brute_force, random_book
+from evaluator import IncrementalEvaluator, DROP_AISLE
+from local_search import LocalSearch, aisle_gains, fill_orders, iterated_local_search, repair_orders
+
+
+def random_instance(make_instance, seed):
+    rng = random.Random(seed)
+    orders, aisles = random_book(rng, 7, 4, 3), random_book(rng, 5, 4, 5, max_items=3)
+    return make_instance(4, orders, aisles, 1, rng.randint(5, 12))
+
+
+def start_state(inst, rng):
+    # A random aisle set, filled with the orders it can supply
+    aisles = rng.sample(range(inst.n_aisles), rng.randint(1, inst.n_aisles))
+    state = IncrementalEvaluator(inst, (), aisles)
+    fill_orders(state)
+    return state
+
+
+def assert_feasible_wave(inst, orders, aisles):
+    checker = WaveOrderPicking(inst)
+    assert checker.is_solution_feasible(list(orders), list(aisles))
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_aisle_gains(make_instance, seed):
+    inst = random_instance(make_instance, seed)
+    state = start_state(inst, random.Random(seed))
+    room = inst.wave_size_ub - state.units
+    slack = state.stock - state.demand
+    gains = aisle_gains(inst, slack, state.order_selected, room, state.aisle_selected)
+
+    for aisle in range(inst.n_aisles):
+        expected = 0
+        if not state.aisle_selected[aisle]:
+            extra = slack.copy()
+            items, qty = inst.aisle(aisle)
+            extra[items] += qty
+            for o in range(inst.n_orders):
+                items, qty = inst.order(o)
+                if (not state.order_selected[o] and inst.order_units[o] <= room
+                        and np.any(slack[items] < qty) and np.all(extra[items] >= qty)):
+                    expected += inst.order_units[o]
+        assert gains[aisle] == expected
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_fill_and_repair_keep_stock_feasible(make_instance, seed):
+    rng = random.Random(seed)
+    inst = random_instance(make_instance, seed)
+    state = start_state(inst, rng)
+    assert state.num_short == 0 and state.units <= inst.wave_size_ub
+
+    aisle = rng.choice(sorted(state.visited_aisles()))
+    state.apply(DROP_AISLE, aisle)
+    repair_orders(state, aisle)
+    assert state.num_short == 0 and state.units <= inst.wave_size_ub
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_descent_and_ils_improve_feasible_waves(make_instance, seed):
+    rng = random.Random(seed)
+    inst = random_instance(make_instance, seed)
+    state = start_state(inst, rng)
+    if not state.is_feasible():
+        pytest.skip("random start below the wave lower bound")
+    start = state.objective()
+
+    search = LocalSearch(inst, random.Random(seed))
+    while search.step(state):
+        assert state.is_feasible() and state.objective() > start
+        start = state.objective()
+        assert_feasible_wave(inst, state.selected_orders(), state.visited_aisles())
+
+    orders, aisle_mask, objective = iterated_local_search(inst, state.selected_orders(), state.visited_aisles(),
+                                                          random.Random(seed))
+    assert objective >= start
+    assert objective <= brute_force(inst) + 1e-9
+    assert_feasible_wave(inst, orders, np.nonzero(aisle_mask)[0].tolist())
+
+
+def test_kick_on_an_empty_wave(make_instance):
+    # With wave_size_lb == 0 the empty wave is feasible and no order fits any aisle set
+    inst = make_instance(2, [{0: 5}, {0: 5, 1: 1}], [{0: 2}, {0: 2}, {1: 1}], 0, 10)
+    state = IncrementalEvaluator(inst, (), ())
+    LocalSearch(inst, random.Random(0)).kick(state)
+    assert not state.selected_orders() and not state.visited_aisles()
+
+    orders, aisle_mask, objective = iterated_local_search(inst, [], [], random.Random(0))
+    assert not orders and not aisle_mask.any() and objective == 0
+    assert graspV2.grasp_aisle_based_batch(inst, iterations=20, rng=random.Random(0)) is None
@@ -0,0 +1,57 @@
+import numpy as np
+import psoV3
+from checker import WaveOrderPicking
+
+def test_swarm_demand_matches_instance_demand(toy_instance):
+    engine = psoV3.SwarmEngine(toy_instance, np.random.default_rng(0))
+    orders = np.random.default_rng(1).random((16, toy_instance.n_orders)) < 0.5
+    expected = np.array([toy_instance.demand(row) for row in orders])
+    assert np.array_equal(engine.demand(orders), expected)
+
+
+def test_swarm_fitness_is_feasible(toy_instance):
+    engine = psoV3.SwarmEngine(toy_instance, np.random.default_rng(0))
+    orders, choice = engine.initialize(32)
+    fitness, _, _ = engine.evaluate(orders, choice)
+    checker = WaveOrderPicking(toy_instance)
+    for p in np.nonzero(fitness)[0].tolist():
+        selected, picks = engine.position(orders[p], choice[p])
+        aisles = set(picks.values())
+        assert checker.is_solution_feasible(selected, aisles)
+        assert fitness[p] == checker.compute_objective_function(selected, aisles)
+
+
+def test_pso_is_quiet_unless_verbose(toy_instance, capsys):
+    psoV3.pso(toy_instance, seed=0)
+    assert capsys.readouterr().out == ""
+    psoV3.pso(toy_instance, seed=0, verbose=True)
+    out = capsys.readouterr().out
+    assert "Iteration 1/" in out and "Best fitness:" in out and "Tabu store:" in out
+
+
+def test_nonzero_2d():
+    mask = np.random.default_rng(0).random((7, 13)) < 0.4
+    rows, cols = psoV3.nonzero_2d(mask)
+    expected = np.nonzero(mask)
+    assert np.array_equal(rows, expected[0]) and np.array_equal(cols, expected[1])
+
+
+def test_demand_cache_hits(toy_instance):
+    # Particles whose order mutation leaves the wave bounds keep their selection, so its demand is reused
+    cache = psoV3.LRUCache(psoV3.CACHE_SIZE)
+    position, fitness = psoV3.pso(toy_instance, seed=0, cache=cache)
+    assert cache.hits > 0
+
+    engine = psoV3.SwarmEngine(toy_instance, np.random.default_rng(0))
+    hasher = psoV3.ZobristHasher(toy_instance.n_orders, toy_instance.n_items, seed=0)
+    orders = np.random.default_rng(1).random((16, toy_instance.n_orders)) < 0.5
+    hashes = hasher.hash_orders(orders)
+    expected = engine.demand(orders)
+    fresh = psoV3.LRUCache()
+    assert np.array_equal(psoV3.cached_demand(engine, fresh, orders, hashes), expected)
+    assert np.array_equal(psoV3.cached_demand(engine, fresh, orders, hashes), expected)
+    assert fresh.hits >= len(orders)
+
+    checker = WaveOrderPicking(toy_instance)
+    assert checker.is_solution_feasible(position[0], set(position[1].values()))
+    assert fitness == checker.compute_objective_function(position[0], set(position[1].values()))
@@ -0,0 +1,62 @@
+import itertools
+import random
+import numpy as np
+import pytest
+from conftest import brute_force, random_book
+from reduction import reduce_instance
+
+
+def is_feasible(inst, orders, aisles):
+    # Orders may repeat (merged copies); aisles are a set
+    demand = np.zeros(inst.n_items, dtype=np.int64)
+    for o in orders:
+        items, qty = inst.order(o)
+        demand[items] += qty
+    units = int(demand.sum())
+    return inst.wave_size_lb <= units <= inst.wave_size_ub and bool(np.all(demand <= inst.supply(set(aisles))))
+
+
+def feasible_waves(inst):
+    for n in range(1, inst.n_orders + 1):
+        for orders in itertools.combinations(range(inst.n_orders), n):
+            for k in range(1, inst.n_aisles + 1):
+                for aisles in itertools.combinations(range(inst.n_aisles), k):
+                    if is_feasible(inst, orders, aisles):
+                        yield list(orders), list(aisles)
+
+
+def random_instance(make_instance, seed):
+    rng = random.Random(seed)
+    orders = random_book(rng, 4, 4, 3)
+    orders += [dict(orders[0]), {0: 9}]  # a duplicate and an order no aisle set can supply
+    aisles = random_book(rng, 4, 4, 4, max_items=3)
+    aisles.append({0: 10, 1: 10, 2: 10, 3: 10})
+    return make_instance(5, orders, aisles, 1, rng.randint(4, 9))
+
+
+@pytest.mark.parametrize("seed", range(8))
+@pytest.mark.parametrize("merge", [False, True])
+def test_map_forward_and_back_keep_waves_feasible(make_instance, seed, merge):
+    inst = random_instance(make_instance, seed)
+    reduction = reduce_instance(inst, merge_duplicates=merge)
+    reduced = reduction.instance
+    units = lambda wave_inst, orders: int(wave_inst.order_units[list(orders)].sum())
+
+    for orders, aisles in feasible_waves(inst):
+        forward = reduction.map_forward(orders, aisles)
+        assert forward is not None
+        assert is_feasible(reduced, *forward)
+        assert units(reduced, forward[0]) == units(inst, orders) and len(forward[1]) <= len(aisles)
+
+        back_orders, back_aisles = reduction.map_back(*forward)
+        assert sorted(back_orders) == sorted(set(back_orders))
+        assert is_feasible(inst, back_orders, back_aisles)
+        assert units(inst, back_orders) == units(inst, orders)
+
+
+@pytest.mark.parametrize("seed", range(8))
+def test_reduction_keeps_the_optimum(make_instance, seed):
+    inst = random_instance(make_instance, seed)
+    reduction = reduce_instance(inst)
+    assert brute_force(reduction.instance) == brute_force(inst)
+    assert 5 not in reduction.order_ids.tolist()
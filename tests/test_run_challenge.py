@@ -0,0 +1,36 @@
+import sys
+import run_challenge
+from conftest import ROOT, write_instance
+from solution_io import write_solution
+
+
+def solver(code):
+    # java_command stand-in running `code` with the output file as sys.argv[1]
+    return lambda input_file, output_file, max_heap: [sys.executable, "-c", code, output_file]
+
+
+def test_run_job_reports_failure_and_ignores_stale_output(tmp_path, monkeypatch):
+    input_file = write_instance(str(tmp_path / "instance.txt"), 1, [{0: 1}], [{0: 1}], 1, 1)
+    output_file = str(tmp_path / "output.txt")
+    write_solution(output_file, [0], [0])
+
+    monkeypatch.setattr(run_challenge, "java_command", solver("import sys; sys.exit(3)"))
+    report = run_challenge.run_job(input_file, output_file, "1g")
+    assert report["exit_code"] == 3
+    assert report["status"] == "failed"
+    assert not report["feasible"]
+
+    monkeypatch.setattr(run_challenge, "java_command", solver(f"import sys; sys.exit({run_challenge.TIMEOUT_EXIT_CODE})"))
+    assert run_challenge.run_job(input_file, output_file, "1g")["status"] == "timeout"
+
+
+def test_run_job_checks_the_new_output(tmp_path, monkeypatch):
+    input_file = write_instance(str(tmp_path / "instance.txt"), 1, [{0: 1}], [{0: 1}], 1, 1)
+    output_file = str(tmp_path / "output.txt")
+    code = "import sys; from solution_io import write_solution; write_solution(sys.argv[1], [0], [0])"
+    monkeypatch.setattr(run_challenge, "java_command", solver(code))
+    monkeypatch.setenv("PYTHONPATH", ROOT)
+
+    report = run_challenge.run_job(input_file, output_file, "1g")
+    assert report["status"] == "ok"
+    assert report["feasible"] and report["objective"] == 1.0
@@ -0,0 +1,52 @@
+import os
+import pytest
+from solution_io import is_binary, read_solution, write_solution
+
+
+@pytest.mark.parametrize("name", ["solution.txt", "solution.bin"])
+def test_round_trip(tmp_path, name):
+    path = str(tmp_path / name)
+    write_solution(path, [5, 1, 3, 1], {7, 2})
+    assert is_binary(path) == name.endswith(".bin")
+    assert read_solution(path) == ([1, 3, 5], [2, 7])
+    assert os.listdir(tmp_path) == [name]
+
+
+def test_format_override_and_empty_wave(tmp_path):
+    path = str(tmp_path / "solution.txt")
+    write_solution(path, [], [], binary=True)
+    assert is_binary(path)
+    assert read_solution(path) == ([], [])
+
+    write_solution(path, [0], [4], binary=False)
+    with open(path) as file:
+        assert file.read() == "1\n0\n1\n4\n"
+
+
+def test_negative_ids_are_rejected(tmp_path):
+    path = str(tmp_path / "solution.bin")
+    write_solution(path, [1], [2])
+    with pytest.raises(ValueError):
+        write_solution(path, [-1, 2], [0])
+    with pytest.raises(ValueError):
+        write_solution(path, [1], [2 ** 32])
+    assert read_solution(path) == ([1], [2])
+
+
+@pytest.mark.parametrize("content", ["3\n1\n2\n", "2\n1\n2\n", ""])
+def test_truncated_text_solutions(tmp_path, content):
+    path = tmp_path / "solution.txt"
+    path.write_text(content)
+    with pytest.raises(ValueError):
+        read_solution(str(path))
+
+
+def test_truncated_binary_solution(tmp_path):
+    path = str(tmp_path / "solution.bin")
+    write_solution(path, [1, 2, 3], [4])
+    with open(path, "rb") as file:
+        data = file.read()
+    with open(path, "wb") as file:
+        file.write(data[:-4])
+    with pytest.raises(ValueError):
+        read_solution(path)
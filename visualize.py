@@ -7,11 +7,10 @@ import bisect
 import random
 import matplotlib.pyplot as plt
 import itertools
+import sys
 import explorer
 
-orders, warehouse, lb, ub = explorer.parse()
-
-def analyze_batch(order_indices, warehouse):
+def analyze_batch(order_indices, orders, warehouse):
     #print("\n🔍 Batch Analysis 🔍")
     batch_orders = [orders[i] for i in order_indices]
     
@@ -58,7 +57,7 @@ def plot_search_space(orders, warehouse, max_combination_size=5):
     
     for r in range(1, max_combination_size + 1):
         for order_indices in itertools.combinations(range(len(orders)), r):
-            stats = analyze_batch(order_indices, warehouse)
+            stats = analyze_batch(order_indices, orders, warehouse)
             combinations.append(order_indices)
             efficiencies.append(stats['efficiency'])
     
@@ -71,4 +70,7 @@ def plot_search_space(orders, warehouse, max_combination_size=5):
     plt.grid(True)
     plt.show()
 
-plot_search_space(orders, warehouse)
\ No newline at end of file
+if __name__ == "__main__":
+    # python visualize.py [input_file]; the instance is read through the shared CSR loader (instance.py)
+    orders, warehouse, lb, ub = explorer.parse(sys.argv[1] if len(sys.argv) > 1 else None)
+    plot_search_space(orders, warehouse)
\ No newline at end of file